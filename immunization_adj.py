@@ -1,30 +1,12 @@
-class Vertex:
-    def __init__(self, vtx_name: str, vtx_type: str):
-        self.name = vtx_name
-        self.type = vtx_type
-        self.adjacent = []
-
-    def __eq__(self, other):
-        if isinstance(other, Vertex):
-            return self.name == other.name and \
-                   self.type == other.type
-        return False
-
-    def __str__(self):
-        return str(self.name) + ' connected to ' + \
-               str([x.type + ": " + x.name for x in self.adjacent])
-
-    def add_connection(self, conn):
-        if conn not in self.adjacent:
-            self.adjacent.append(conn)
-
-    def get_connections(self):
-        return self.adjacent
+from immunization_search import iter_bfs, iter_dfs
+from immunization_vertex import Vertex
 
 
 class Immunization:
     def __init__(self):
         self.vertex_list = []
+        # Vertex -> list of the vertices it is connected to
+        self.adjacency = {}
 
     def __iter__(self):
         return iter(self.vertex_list)
@@ -38,16 +20,19 @@ class Immunization:
 
     def add_vertex(self, vtx_name, vtx_type):
         new_vertex = Vertex(vtx_name, vtx_type)
-        if new_vertex not in self.vertex_list:
+        if new_vertex not in self.adjacency:
             self.vertex_list.append(new_vertex)
+            self.adjacency[new_vertex] = []
 
     def is_vertex_present(self, v):
-        return v in self.vertex_list
+        return v in self.adjacency
 
     def list_connections(self, v):
-        list_conn = [ve for s in self.vertex_list if s == v
-                     for ve in s.get_connections()]
-        return list_conn
+        return list(self.adjacency.get(v, ()))
+
+    def vertex_info(self, v):
+        return str(v.name) + ' connected to ' + \
+               str([x.type + ": " + x.name for x in self.adjacency[v]])
 
     def add_edge(self, strn, vacc):
         """ """
@@ -56,12 +41,13 @@ class Immunization:
         vacc_vertex = Vertex(vacc, 'vaccine')
 
         if not self.is_vertex_present(str_vertex):
-            self.add_vertex(str_vertex, 'strain')
+            self.add_vertex(strn, 'strain')
         if not self.is_vertex_present(vacc_vertex):
-            self.add_vertex(vacc_vertex, 'vaccine')
+            self.add_vertex(vacc, 'vaccine')
 
-        self[str_vertex.name].add_connection(vacc_vertex)
-        self[vacc_vertex.name].add_connection(str_vertex)
+        if vacc_vertex not in self.adjacency[str_vertex]:
+            self.adjacency[str_vertex].append(vacc_vertex)
+            self.adjacency[vacc_vertex].append(str_vertex)
 
     def readInputFile(self, input_file):
         """ """
@@ -107,8 +93,8 @@ class Immunization:
     def displayStrains(self, vaccine):
         output_intro_str = """--------Function displayStrain --------\n"""
         vacc = Vertex(vaccine, 'vaccine')
-        if vacc in self.vertex_list:
-            list_strains = [v.name for v in self[vaccine].get_connections()]
+        if vacc in self.adjacency:
+            list_strains = [v.name for v in self.adjacency[vacc]]
             vaccine_info = "Vaccine name: " + vaccine + "\n" + \
                            "List of Strains:\n"
             if len(list_strains) > 0:
@@ -127,8 +113,8 @@ class Immunization:
         """ """
         output_intro_str = """--------Function displayVaccine --------\n"""
         strn = Vertex(strain, 'strain')
-        if strn in self.vertex_list:
-            list_vaccines = [v.name for v in self[strain].get_connections()]
+        if strn in self.adjacency:
+            list_vaccines = [v.name for v in self.adjacency[strn]]
             strain_info = "Strain name: " + strain + "\n" + \
                           "List of Vaccines:\n"
             if len(list_vaccines) > 0:
@@ -143,20 +129,52 @@ class Immunization:
         #     fout.write(output_intro_str + output_info)
         #     fout.close()
 
+    def _traverse(self, traversal, strt, max_depth):
+        """Run a traversal of immunization_search from the vaccine strt."""
+        start = Vertex(strt, 'vaccine')
+        if start not in self.adjacency:
+            return iter(())
+        return traversal(start, self.adjacency.__getitem__, max_depth)
+
+    def iter_dfs(self, strt, max_depth=None):
+        """Lazy depth-first search of the graph, from the vaccine strt.
+        Yield (Vertex, depth) in visited order, the first being start,
+        nothing if start does not exist. Nothing is printed, and
+        stopping the iteration stops the search, e.g. the first 10
+        vaccines reached are
+            islice((v for v, _ in g.iter_dfs(strt)
+                    if v.type == 'vaccine'), 10)
+        """
+        return self._traverse(iter_dfs, strt, max_depth)
+
+    def iter_bfs(self, strt, max_depth=None):
+        """Lazy breadth-first search of the graph, from the vaccine strt.
+        Yield (Vertex, depth) in visited order, the first being start,
+        nothing if start does not exist. Nothing is printed, and
+        stopping the iteration stops the search.
+        """
+        return self._traverse(iter_bfs, strt, max_depth)
+
     def dfs(self, strt):
         """Do a depth-first search of the graph, from the start node.
         Return a list of nodes in visited order, the first being start.
         Assume the start node exists.
+        Nodes are marked when pushed on the stack, so the order is
+        not the preorder of iter_dfs.
         """
         start = Vertex(strt, 'vaccine')
+        if start not in self.adjacency:
+            return []
         visited = []
         to_visit = [start]
+        seen = {start}
         while to_visit:
             next_node = to_visit.pop()
             visited.append(next_node)
-            print(self[next_node.name])
-            for conn in self.list_connections(next_node):
-                if conn not in visited and conn not in to_visit:
+            print(self.vertex_info(next_node))
+            for conn in self.adjacency[next_node]:
+                if conn not in seen:
+                    seen.add(conn)
                     to_visit.append(conn)
         return visited
 
@@ -165,16 +183,10 @@ class Immunization:
         Return a list of nodes in visited order, the first being start.
         Assume the start node exists.
         """
-        start = Vertex(strt, 'vaccine')
         visited = []
-        to_visit = [start]
-        while to_visit:
-            next_node = to_visit.pop(0)
-            visited.append(next_node)
-            print(self[next_node.name])
-            for conn in self.list_connections(next_node):
-                if conn not in visited and conn not in to_visit:
-                    to_visit.append(conn)
+        for node, _ in self.iter_bfs(strt):
+            visited.append(node)
+            print(self.vertex_info(node))
         return visited
 
     def commonStrain(self, vacA, vacB):
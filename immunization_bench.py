@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import accumulate
+
+from immunization_sink import NullSink
+from main import Immunization
+
+# edge counts benchmarked by default
+SIZES = (1000, 10000, 100000)
+SEED = 0
+# exponent of the power-law degree distributions
+ALPHA = 2.5
+# mean number of vaccines per strain
+MEAN_DEGREE = 3
+# slowdown ratio reported as a regression by compare
+THRESHOLD = 1.2
+OPERATIONS = ("readInputfile", "displayAll", "displayStrains",
+              "displayVaccine", "commonStrain", "findVaccineConnect")
+
+
+def generate_graph(n_edges, seed=SEED, alpha=ALPHA, path=None):
+    """
+    Write a random strain/vaccine graph in the inputPS16.txt
+    format. Vaccine popularity follows a Zipf law and strain
+    degrees a power law of exponent alpha, so a few vaccines
+    and strains hold most of the edges, as in real data.
+    The same arguments always give the same file.
+    :param n_edges: number of edges, about 1e3 to 1e7.
+    :param seed: seed of the random generator.
+    :param alpha: exponent of the degree distributions (> 2).
+    :param path: path of the file written, a file of the
+                 temporary directory by default, reused when
+                 it already exists.
+    :return: path of the file.
+    """
+    if path is None:
+        path = os.path.join(
+            tempfile.gettempdir(),
+            f"immunization_bench_{n_edges}_{seed}_{alpha}.txt")
+        if os.path.exists(path):
+            return path
+    rnd = random.Random(seed)
+    n_vaccines = max(2, n_edges // (10 * MEAN_DEGREE))
+    vaccines = [f"Vaccine-{i}" for i in range(n_vaccines)]
+    weights = list(accumulate((i + 1) ** (-1 / (alpha - 1))
+                              for i in range(n_vaccines)))
+    # scale the pareto variates so their mean is MEAN_DEGREE
+    scale = MEAN_DEGREE * (alpha - 2) / (alpha - 1)
+    edges = 0
+    strain = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fout:
+        while edges < n_edges:
+            degree = int(scale * rnd.paretovariate(alpha - 1)) + 1
+            degree = min(degree, n_vaccines, n_edges - edges)
+            row = dict.fromkeys(
+                rnd.choices(vaccines, cum_weights=weights, k=degree))
+            fout.write(f"Strain-{strain} / " + " / ".join(row) + "\n")
+            edges += len(row)
+            strain += 1
+    os.replace(tmp_path, path)
+    return path
+
+
+def _queries(graph, rnd, n_queries):
+    """
+    Random arguments of the queries, drawn from the graph.
+    :return: dict operation -> list of argument tuples.
+    """
+    strains = [x.name for x in graph if x.type == 'strain']
+    vaccines = [x.name for x in graph if x.type == 'vaccine']
+    return {
+        "displayAll": [()],
+        "displayStrains": [(rnd.choice(vaccines),)
+                           for _ in range(n_queries)],
+        "displayVaccine": [(rnd.choice(strains),)
+                           for _ in range(n_queries)],
+        "commonStrain": [(rnd.choice(vaccines), rnd.choice(vaccines))
+                         for _ in range(n_queries)],
+        "findVaccineConnect": [(rnd.choice(vaccines), rnd.choice(vaccines))
+                               for _ in range(n_queries)],
+    }
+
+
+def _measure(function, calls, repeat):
+    """
+    Best wall time of running function on every call of
+    calls, then peak memory allocated by one more run.
+    :return: (seconds, peak bytes).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in calls:
+            function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    for args in calls:
+        function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes=SIZES, seed=SEED, repeat=3, n_queries=100,
+                   frozen=False):
+    """
+    Time the operations of Immunization on generated graphs.
+    Outputs go to a NullSink and the query cache is disabled,
+    so every call does the full work.
+    :param sizes: numbers of edges of the graphs.
+    :param seed: seed of the generator and of the queries.
+    :param repeat: number of timed runs, the best is kept.
+    :param n_queries: number of calls of each query.
+    :param frozen: load the graphs in their compact form.
+    :return: dict of the run, see write_json.
+    """
+    results = []
+    for n_edges in sizes:
+        path = generate_graph(n_edges, seed)
+
+        def load():
+            graph = Immunization(sink=NullSink(), cache_size=0)
+            return graph.readInputfile(path, frozen=frozen)
+
+        seconds, peak = _measure(load, [()], repeat)
+        results.append({"edges": n_edges, "operation": "readInputfile",
+                        "calls": 1, "seconds": seconds,
+                        "peak_bytes": peak})
+        graph = load()
+        queries = _queries(graph, random.Random(seed), n_queries)
+        for operation in OPERATIONS[1:]:
+            calls = queries[operation]
+            seconds, peak = _measure(getattr(graph, operation), calls,
+                                     repeat)
+            results.append({"edges": n_edges, "operation": operation,
+                            "calls": len(calls), "seconds": seconds,
+                            "peak_bytes": peak})
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed, "repeat": repeat, "frozen": frozen,
+            "results": results}
+
+
+def write_json(run, path):
+    """
+    Save a run of run_benchmarks.
+    :param run: dict returned by run_benchmarks.
+    :param path: path of the JSON file, '-' for stdout.
+    """
+    if path == "-":
+        json.dump(run, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w") as fout:
+        json.dump(run, fout, indent=2)
+
+
+def compare(baseline, run, threshold=THRESHOLD):
+    """
+    Compare a run to a baseline run of another version.
+    :param baseline: dict of the baseline run.
+    :param run: dict of the new run.
+    :param threshold: slowdown ratio considered a regression.
+    :return: list of (edges, operation, baseline seconds,
+             seconds, ratio) of the regressions.
+    """
+    before = {(r["edges"], r["operation"]): r["seconds"]
+              for r in baseline["results"]}
+    regressions = []
+    for result in run["results"]:
+        key = (result["edges"], result["operation"])
+        if before.get(key):
+            ratio = result["seconds"] / before[key]
+            if ratio > threshold:
+                regressions.append(key + (before[key], result["seconds"],
+                                          ratio))
+    return regressions
+
+
+# pytest-benchmark entry points, run with
+#     pytest immunization_bench.py --benchmark-json=bench.json
+try:
+    import pytest
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    pytest = None
+
+if pytest is not None:
+    @pytest.fixture(scope="module", params=SIZES)
+    def bench_graph(request):
+        """Graph generated for one size, with its queries."""
+        path = generate_graph(request.param)
+        graph = Immunization(sink=NullSink(), cache_size=0)
+        graph.readInputfile(path)
+        return path, graph, _queries(graph, random.Random(SEED), 100)
+
+    def test_readInputfile(benchmark, bench_graph):
+        path = bench_graph[0]
+        benchmark(lambda: Immunization(sink=NullSink(), cache_size=0)
+                  .readInputfile(path))
+
+    @pytest.mark.parametrize("operation", OPERATIONS[1:])
+    def test_query(benchmark, bench_graph, operation):
+        _, graph, queries = bench_graph
+        function = getattr(graph, operation)
+        calls = queries[operation]
+
+        def run():
+            for args in calls:
+                function(*args)
+        benchmark(run)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark Immunization on generated graphs.")
+    arg_parser.add_argument('--sizes', type=float, nargs='+',
+                            default=SIZES,
+                            help="numbers of edges, e.g. 1e3 1e5 1e7")
+    arg_parser.add_argument('--seed', type=int, default=SEED)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--queries', type=int, default=100,
+                            help="number of calls of each query")
+    arg_parser.add_argument('--frozen', action='store_true',
+                            help="benchmark the compact graph")
+    arg_parser.add_argument('--output', default='-',
+                            help="JSON file of the results")
+    arg_parser.add_argument('--compare',
+                            help="JSON file of a baseline run, exits "
+                                 "with 1 on regressions")
+    arg_parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = arg_parser.parse_args()
+
+    run = run_benchmarks([int(n) for n in args.sizes], args.seed,
+                         args.repeat, args.queries, args.frozen)
+    write_json(run, args.output)
+    for result in run["results"]:
+        print(f"{result['edges']:>10} {result['operation']:<20}"
+              f"{result['seconds']:>12.6f}s {result['peak_bytes']:>14}B",
+              file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as fi:
+            regressions = compare(json.load(fi), run, args.threshold)
+        for edges, operation, before, after, ratio in regressions:
+            print(f"REGRESSION {edges} {operation}: {before:.6f}s -> "
+                  f"{after:.6f}s (x{ratio:.2f})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,188 @@
+def _tarjan(nodes, neighbours):
+    """
+    Biconnected components of a graph, Hopcroft-Tarjan with an
+    explicit stack instead of recursion, in O(V + E).
+    :param nodes: iterable of all the vertices.
+    :param neighbours: function node -> iterable of nodes.
+    :return: (blocks, cuts, bridges): the lists of vertices of
+             the blocks (an isolated vertex is a block of its
+             own), the ordered set (dict) of the articulation
+             points and the list of the (parent, child) edges
+             of the DFS tree that are bridges.
+    """
+    disc = dict()
+    low = dict()
+    blocks = []
+    cuts = dict()
+    bridges = []
+    for root in nodes:
+        if root in disc:
+            continue
+        disc[root] = low[root] = len(disc)
+        stack = [(root, None, iter(neighbours(root)))]
+        edges = []
+        children = 0
+        while stack:
+            node, parent, conns = stack[-1]
+            for conn in conns:
+                if conn not in disc:
+                    disc[conn] = low[conn] = len(disc)
+                    edges.append((node, conn))
+                    stack.append((conn, node, iter(neighbours(conn))))
+                    break
+                if conn != parent and disc[conn] < disc[node]:
+                    low[node] = min(low[node], disc[conn])
+                    edges.append((node, conn))
+            else:
+                stack.pop()
+                if parent is None:
+                    continue
+                low[parent] = min(low[parent], low[node])
+                if low[node] < disc[parent]:
+                    continue
+                # parent separates the subtree of node: its edges
+                # are on the stack down to (parent, node)
+                block = dict()
+                while True:
+                    a, b = edges.pop()
+                    block[a] = block[b] = None
+                    if a == parent and b == node:
+                        break
+                blocks.append(list(block))
+                if low[node] > disc[parent]:
+                    bridges.append((parent, node))
+                if parent != root:
+                    cuts[parent] = None
+                else:
+                    children += 1
+        if children > 1:
+            cuts[root] = None
+        elif not children:
+            blocks.append([root])
+    return blocks, cuts, bridges
+
+
+class BlockCutTree:
+    """
+    Block-cut tree of a graph: its blocks (biconnected
+    components) and articulation points (cuts), a block being
+    linked to the cuts it contains. Removing a cut splits its
+    connected component into one piece per neighbour of the
+    cut in the tree, any other vertex leaves it connected.
+    The tree is walked once in preorder and every vertex is
+    listed at its tree node (a cut at its own node, any other
+    vertex at its only block), so the vertices below a tree
+    node are a slice of that listing and the pieces left by
+    removing a vertex are read from it without any search.
+    Initialised using :
+    blocks - lists of the vertices of the blocks.
+    cuts - ordered set (dict) of the articulation points.
+    bridges - list of the edges whose removal disconnects
+              the graph.
+    Built with :
+    order - vertices in preorder of the tree.
+    block_range / cut_range - tree node -> (start, end) of
+                              the slice of order below it.
+    cut_blocks - cut -> its child blocks.
+    component - block -> (start, end) of the slice of order
+                of its connected component.
+    owner - non cut vertex -> its block.
+    """
+
+    def __init__(self, blocks, cuts, bridges):
+        """Lay out the tree of the given blocks and cuts."""
+        self.blocks = blocks
+        self.cuts = cuts
+        self.bridges = bridges
+        self.order = []
+        self.block_range = [None] * len(blocks)
+        self.cut_range = dict()
+        self.cut_blocks = dict()
+        self.component = [None] * len(blocks)
+        self.owner = dict()
+        block_cuts = [[] for _ in blocks]
+        cut_adjacent = {x: [] for x in cuts}
+        for i, block in enumerate(blocks):
+            for x in block:
+                if x in cuts:
+                    block_cuts[i].append(x)
+                    cut_adjacent[x].append(i)
+                else:
+                    self.owner[x] = i
+        for root in range(len(blocks)):
+            if self.block_range[root] is None:
+                self._lay_out(root, block_cuts, cut_adjacent)
+
+    @classmethod
+    def from_graph(cls, nodes, neighbours):
+        """
+        Build the tree of a graph.
+        :param nodes: iterable of all the vertices.
+        :param neighbours: function node -> iterable of nodes.
+        """
+        return cls(*_tarjan(nodes, neighbours))
+
+    def _lay_out(self, root, block_cuts, cut_adjacent):
+        """Walk the tree of the component of block root."""
+        order = self.order
+        start = len(order)
+        members = [root]
+        # (is a block, tree node, parent, iterator of children)
+        stack = [(True, root, None, None)]
+        while stack:
+            is_block, key, parent, children = stack.pop()
+            if children is None:
+                if is_block:
+                    self.block_range[key] = len(order)
+                    order.extend(x for x in self.blocks[key]
+                                 if x not in self.cuts)
+                    children = iter([x for x in block_cuts[key]
+                                     if x != parent])
+                else:
+                    self.cut_range[key] = len(order)
+                    order.append(key)
+                    self.cut_blocks[key] = [i for i in cut_adjacent[key]
+                                            if i != parent]
+                    children = iter(self.cut_blocks[key])
+                    members.extend(self.cut_blocks[key])
+            child = next(children, None)
+            if child is not None:
+                stack.append((is_block, key, parent, children))
+                stack.append((not is_block, child, key, None))
+            elif is_block:
+                self.block_range[key] = (self.block_range[key], len(order))
+            else:
+                self.cut_range[key] = (self.cut_range[key], len(order))
+        span = (start, len(order))
+        for i in members:
+            self.component[i] = span
+
+    def __contains__(self, node):
+        return node in self.cuts or node in self.owner
+
+    def is_cut(self, node):
+        """Check if removing node disconnects its component."""
+        return node in self.cuts
+
+    def pieces(self, node):
+        """
+        What if node were removed: the pieces its connected
+        component would break into, in O(size of the pieces).
+        :param node: vertex of the graph.
+        :return: list of lists of vertices, one list for a
+                 vertex that is not a cut, none for an isolated
+                 vertex.
+        """
+        order = self.order
+        if node not in self.cuts:
+            start, end = self.component[self.owner[node]]
+            rest = [x for x in order[start:end] if x != node]
+            return [rest] if rest else []
+        pieces = [order[slice(*self.block_range[i])]
+                  for i in self.cut_blocks[node]]
+        start, end = self.cut_range[node]
+        first, last = self.component[self.cut_blocks[node][0]]
+        above = order[first:start] + order[end:last]
+        if above:
+            pieces.append(above)
+        return pieces
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+# number of results kept by default
+CACHE_SIZE = 1024
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results, valid for one version
+    of the graph. Looking up a key with another graph version
+    drops every entry, so no stale result is ever returned.
+    Initialised using :
+    max_size - maximum number of results kept.
+    Statistics : hits, misses, evictions (entries dropped to
+    make room) and invalidations (full drops on graph change).
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        """Initialise an empty cache."""
+        self.max_size = max_size
+        self.version = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """
+        Cached result of a query.
+        :param key: hashable key of the query.
+        :param version: current version of the graph.
+        :return: the result, None on a miss.
+        """
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, version, result):
+        """
+        Store the result of a query.
+        :param key: hashable key of the query.
+        :param version: version of the graph it was computed on.
+        :param result: result, must not be None.
+        :return: result.
+        """
+        if version != self.version or self.max_size <= 0:
+            return result
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def clear(self):
+        """Drop every entry, keeping the statistics."""
+        self._entries.clear()
+
+    def stats(self):
+        """Statistics as a dict."""
+        return {"size": len(self._entries), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations}
+
+    def __str__(self):
+        return "Cache: " + ", ".join(
+            f"{k}={v}" for k, v in self.stats().items())
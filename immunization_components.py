@@ -0,0 +1,224 @@
+from array import array
+from collections import defaultdict, deque
+
+# vertices split may visit before it gives up, leaving the
+# index stale
+SPLIT_BUDGET = 4096
+
+
+def _split_side(node_a, node_b, neighbours, budget=None):
+    """
+    After the edge node_a - node_b was removed, find whether
+    they are still connected by growing a BFS from each of
+    them in turn: the first search to run out of nodes without
+    meeting the other one has enumerated a whole component.
+    The cost is bounded by the smaller side when they split,
+    but when they are still connected the searches run until
+    they meet, up to the whole component.
+    :param node_a: handle of the first vertex.
+    :param node_b: handle of the second vertex.
+    :param neighbours: function node -> iterable of nodes.
+    :param budget: limit of the nodes visited, None for none.
+    :return: (split, side): (True, set of the nodes split off),
+             (False, None) if still connected, or (None, None)
+             if the budget ran out first.
+    """
+    seen_a = {node_a}
+    seen_b = {node_b}
+    sides = ((deque([node_a]), seen_a, seen_b),
+             (deque([node_b]), seen_b, seen_a))
+    while True:
+        for frontier, seen, other in sides:
+            node = frontier.popleft()
+            for conn in neighbours(node):
+                if conn in other:
+                    return False, None
+                if conn not in seen:
+                    seen.add(conn)
+                    frontier.append(conn)
+            if not frontier:
+                return True, seen
+        if budget is not None and len(seen_a) + len(seen_b) > budget:
+            return None, None
+
+
+class ComponentIndex:
+    """
+    Connected components of the graph, kept with a union-find
+    (union by size, path halving) so that two vertices can be
+    told apart in O(a(n)) without any traversal.
+    Initialised using :
+    parent - cell -> parent cell, the root of a tree being
+             the representative of its component.
+    size - root -> number of nodes of its component.
+    cells - node -> cell, None when nodes are their own cells.
+    Nodes are vertex handles: Vertex objects are mapped to
+    integer cells, so that the nodes split off by an edge
+    removal can move to a new cell (see split) while the
+    cells they leave behind still link the rest of their old
+    tree. The integer ids of a frozen graph are their own
+    cells, in lists or arrays.
+    A fully compressed index (see flatten) never writes to
+    parent, so read-only buffers can back it.
+    """
+
+    def __init__(self, parent=None, size=None, cells=None):
+        """Initialise an empty index."""
+        if parent is None:
+            parent, size, cells = list(), list(), dict()
+        self.parent = parent
+        self.size = size
+        self.cells = cells
+
+    @classmethod
+    def from_graph(cls, nodes, neighbours):
+        """
+        Build the index of a graph over Vertex handles.
+        :param nodes: iterable of all the vertices.
+        :param neighbours: function node -> iterable of nodes.
+        """
+        index = cls()
+        nodes = list(nodes)
+        for node in nodes:
+            index.add(node)
+        union = index.union
+        for node in nodes:
+            for conn in neighbours(node):
+                union(node, conn)
+        return index
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Build the index of a CompactGraph.
+        :param compact: CompactGraph of the graph.
+        """
+        n = len(compact)
+        index = cls(list(range(n)), [1] * n)
+        union = index.union
+        for strain in range(compact.n_strains):
+            for vaccine in compact.neighbours(strain):
+                union(strain, vaccine)
+        return index
+
+    def __contains__(self, node):
+        if self.cells is not None:
+            return node in self.cells
+        return 0 <= node < len(self.parent)
+
+    def add(self, node):
+        """
+        Register a node as its own component.
+        :param node: handle of the vertex.
+        """
+        if node not in self.cells:
+            cell = len(self.parent)
+            self.cells[node] = cell
+            self.parent.append(cell)
+            self.size.append(1)
+
+    def find(self, node):
+        """
+        Representative of the component of a node.
+        :param node: handle of the vertex.
+        """
+        parent = self.parent
+        if self.cells is not None:
+            node = self.cells[node]
+        while parent[node] != node:
+            grand = parent[parent[node]]
+            if grand != parent[node]:
+                parent[node] = grand
+            node = grand
+        return node
+
+    def union(self, node_a, node_b):
+        """
+        Merge the components of two nodes.
+        :param node_a: handle of the first vertex.
+        :param node_b: handle of the second vertex.
+        :return: the representative of the merged component.
+        """
+        root_a = self.find(node_a)
+        root_b = self.find(node_b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def split(self, node_a, node_b, neighbours, budget=SPLIT_BUDGET):
+        """
+        Update the index once the edge node_a - node_b has been
+        removed from the graph. When the component breaks in
+        two, the smaller side gets a new cell of its own, in
+        time proportional to its size. Telling that it did not
+        break can take a search of the whole component, so the
+        search stops after budget vertices: the index is then
+        left as it was, possibly joining vertices no longer
+        connected, and must be rebuilt.
+        :param node_a: handle of the first vertex.
+        :param node_b: handle of the second vertex.
+        :param neighbours: function node -> iterable of nodes,
+                           on the graph without the edge.
+        :param budget: limit of the vertices visited, None for
+                       none.
+        :return: True if the component was split, False if not,
+                 None if the budget ran out before knowing.
+        """
+        split, side = _split_side(node_a, node_b, neighbours, budget)
+        if not split:
+            return split
+        root = self.find(node_a)
+        cell = len(self.parent)
+        self.parent.append(cell)
+        self.size.append(len(side))
+        self.size[root] -= len(side)
+        for node in side:
+            self.cells[node] = cell
+        return True
+
+    def connected(self, node_a, node_b):
+        """Check if two nodes are in the same component."""
+        return self.find(node_a) == self.find(node_b)
+
+    def component_size(self, node):
+        """Number of vertices in the component of a node."""
+        return self.size[self.find(node)]
+
+    def nodes(self):
+        """All the nodes of the index."""
+        if self.cells is not None:
+            return self.cells.keys()
+        return range(len(self.parent))
+
+    def flatten(self):
+        """
+        Fully compressed copy of an index over integer ids.
+        :return: (parent, size) int32 arrays where parent is the
+                 representative of every node and size the size
+                 of its component.
+        """
+        parent = array('i', (self.find(x) for x in self.nodes()))
+        size = array('i', (self.size[x] for x in parent))
+        return parent, size
+
+    def groups(self):
+        """
+        Members of every component.
+        :return: dict representative -> list of nodes.
+        """
+        groups = defaultdict(list)
+        for node in list(self.nodes()):
+            groups[self.find(node)].append(node)
+        return groups
+
+    def members(self, node):
+        """
+        Members of the component of a node.
+        :param node: handle of the vertex.
+        """
+        root = self.find(node)
+        return [x for x in list(self.nodes()) if self.find(x) == root]
@@ -0,0 +1,207 @@
+import heapq
+import math
+
+# search nodes explored by exact_cover before it gives up and
+# keeps its best cover so far, each costs O(elements)
+MAX_NODES = 1 << 16
+# exact_cover only searches instances of at most this many
+# elements and with a best known cover of at most this size
+EXACT_MAX_ELEMENTS = 128
+EXACT_MAX_SIZE = 32
+
+
+def greedy_cover(universe, candidates):
+    """
+    Lazy greedy set cover: repeatedly take the candidate
+    covering the most uncovered elements, the first listed on
+    a tie. Gains only shrink as elements get covered, so a
+    priority queue of stale gains is enough: the top entry is
+    re-evaluated and taken if it is still the best, pushed
+    back with its new gain otherwise.
+    :param universe: iterable of the elements to cover.
+    :param candidates: iterable of (key, iterable of elements).
+    :return: list of the keys taken, in order. Elements of no
+             candidate are left uncovered.
+    """
+    uncovered = set(universe)
+    heap = []
+    for order, (key, elements) in enumerate(candidates):
+        members = uncovered.intersection(elements)
+        if members:
+            heap.append((-len(members), order, key, members))
+    heapq.heapify(heap)
+    cover = []
+    while uncovered and heap:
+        gain, order, key, members = heapq.heappop(heap)
+        members &= uncovered
+        if not members:
+            continue
+        if len(members) < -gain:
+            heapq.heappush(heap, (-len(members), order, key, members))
+            continue
+        cover.append(key)
+        uncovered -= members
+    return cover
+
+
+def packing_bound(universe, containing):
+    """
+    Lower bound of the size of any cover: elements no two of
+    which share a candidate all need a different one. They
+    are picked greedily, least covered elements first.
+    :param universe: iterable of the elements to cover.
+    :param containing: function element -> iterable of the
+                       keys of the candidates containing it.
+    :return: number of elements packed.
+    """
+    options = sorted((list(containing(x)) for x in universe), key=len)
+    used = set()
+    packed = 0
+    for keys in options:
+        if keys and used.isdisjoint(keys):
+            used.update(keys)
+            packed += 1
+    return packed
+
+
+def harmonic(n):
+    """n-th harmonic number, the greedy set cover guarantee."""
+    if n < 64:
+        return sum(1 / k for k in range(1, n + 1))
+    return math.log(n) + 0.5772156649015329 + 1 / (2 * n)
+
+
+def exact_cover(universe, candidates, best=None, max_nodes=MAX_NODES,
+                max_elements=EXACT_MAX_ELEMENTS, max_size=EXACT_MAX_SIZE):
+    """
+    Minimum set cover by branch and bound, for small
+    instances. Elements are bits of an int; every node
+    branches on the candidates of the uncovered element with
+    the fewest of them, and is cut when the candidates taken
+    plus remaining / largest candidate cannot beat the best
+    cover. The search keeps an explicit stack, one frame per
+    candidate taken.
+    :param universe: iterable of the elements to cover, all
+                     contained in some candidate.
+    :param candidates: iterable of (key, iterable of elements).
+    :param best: a known cover (list of keys) to start from,
+                 e.g. the greedy one.
+    :param max_nodes: limit of the search nodes explored.
+    :param max_elements: larger universes are not searched.
+    :param max_size: nor are instances whose best known cover
+                     is larger.
+    :return: (cover, optimal), optimal being False when the
+             instance was too large or the search stopped at
+             max_nodes; cover is then the best one found.
+    """
+    bit = {x: 1 << i for i, x in enumerate(dict.fromkeys(universe))}
+    if len(bit) > max_elements or \
+            best is not None and len(best) > max_size:
+        return list(best or ()), False
+    # equal masks are the same branch, keep the first
+    masks = dict()
+    for key, elements in candidates:
+        mask = 0
+        for x in elements:
+            mask |= bit.get(x, 0)
+        if mask:
+            masks.setdefault(mask, key)
+    best = list(best) if best is not None else list(masks.values())
+    if len(best) > max_size:
+        return best, False
+    full = (1 << len(bit)) - 1
+    largest = max((bin(mask).count('1') for mask in masks), default=1)
+    options = [[] for _ in range(len(bit))]
+    for mask in sorted(masks, key=lambda m: -bin(m).count('1')):
+        for i in range(len(bit)):
+            if mask >> i & 1:
+                options[i].append((masks[mask], mask))
+    chosen = []
+    nodes = 0
+
+    def branches(covered):
+        """Options of a search node, None when it is a leaf."""
+        nonlocal best, nodes
+        if covered == full:
+            if len(chosen) < len(best):
+                best = list(chosen)
+            return None
+        nodes += 1
+        remaining = full & ~covered
+        size = bin(remaining).count('1')
+        if len(chosen) + -(-size // largest) >= len(best):
+            return None
+        element = min((i for i in range(len(bit)) if remaining >> i & 1),
+                      key=lambda i: len(options[i]))
+        return iter(options[element])
+
+    # frames of (covered, options left), chosen holding the
+    # keys taken to reach all but the first
+    root = branches(0)
+    stack = [(0, root)] if root is not None else []
+    while stack and nodes <= max_nodes:
+        covered, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if chosen:
+                chosen.pop()
+            continue
+        key, mask = child
+        chosen.append(key)
+        below = branches(covered | mask)
+        if below is None:
+            chosen.pop()
+        else:
+            stack.append((covered | mask, below))
+    return best, nodes <= max_nodes
+
+
+class VaccineCover:
+    """
+    A set of vaccines covering a set of strains, with the
+    measures of how good it is.
+    Initialised using :
+    vaccines - names of the vaccines of the cover, in the
+               order they were taken.
+    uncovered - names of the strains asked for that no vaccine
+                covers.
+    lower_bound - no cover has fewer vaccines.
+    guarantee - worst case ratio of the greedy cover, H(d)
+                for d the largest number of strains of a
+                vaccine.
+    optimal - the cover is proven minimal.
+    seconds - solve time.
+    """
+
+    def __init__(self, vaccines, uncovered, lower_bound, guarantee,
+                 optimal, seconds):
+        """Initialise a cover."""
+        self.vaccines = vaccines
+        self.uncovered = uncovered
+        self.lower_bound = lower_bound
+        self.guarantee = guarantee
+        self.optimal = optimal
+        self.seconds = seconds
+
+    def __len__(self):
+        return len(self.vaccines)
+
+    def ratio(self):
+        """
+        Approximation ratio certified for this instance: size
+        of the cover over the lower bound, the true ratio is
+        at most this.
+        """
+        if not self.lower_bound:
+            return 1.0
+        return len(self.vaccines) / self.lower_bound
+
+    def __str__(self):
+        return str(len(self.vaccines)) + " vaccines, " + \
+               ("optimal" if self.optimal else
+                f"ratio <= {self.ratio():.3f}") + \
+               f" (greedy bound {self.guarantee:.3f}), " + \
+               str(len(self.uncovered)) + " strains uncovered, " + \
+               f"solved in {self.seconds:.6f}s"
+
@@ -0,0 +1,219 @@
+from array import array
+from bisect import bisect_left
+
+
+def _int32_array(values=()):
+    """Return an array of C ints (32 bits on supported platforms)."""
+    return array('i', values)
+
+
+def _build_csr(n_rows, rows, cols):
+    """
+    Build a compressed sparse row structure from a list of
+    (row, col) pairs given as two parallel arrays. Pairs keep
+    their insertion order inside a row and duplicates are
+    dropped.
+    :param n_rows: number of rows.
+    :param rows: array of row ids.
+    :param cols: array of column ids.
+    :return: (indptr, indices) int32 arrays.
+    """
+    counts = [0] * (n_rows + 1)
+    for r in rows:
+        counts[r + 1] += 1
+    for i in range(n_rows):
+        counts[i + 1] += counts[i]
+    # stable counting sort of the columns by row
+    fill = counts[:-1]
+    indices = _int32_array(bytes(4 * len(cols)))
+    for r, c in zip(rows, cols):
+        indices[fill[r]] = c
+        fill[r] += 1
+
+    # drop duplicate edges, compacting in place
+    indptr = _int32_array([0])
+    write = 0
+    for i in range(n_rows):
+        seen = set()
+        for k in range(counts[i], counts[i + 1]):
+            c = indices[k]
+            if c not in seen:
+                seen.add(c)
+                indices[write] = c
+                write += 1
+        indptr.append(write)
+    del indices[write:]
+    return indptr, indices
+
+
+def _sorted_rows(indptr, indices):
+    """Copy of CSR indices with the columns of every row sorted."""
+    rows = _int32_array()
+    for i in range(len(indptr) - 1):
+        rows.extend(sorted(indices[indptr[i]:indptr[i + 1]]))
+    return rows
+
+
+class CompactGraph:
+    """
+    Frozen, integer-id representation of the strain/vaccine graph.
+    Every vertex gets an id : strains are numbered 0..S-1 and
+    vaccines S..S+V-1, in insertion order. Initialised using :
+    names - string table, id -> name.
+    strain_ids / vaccine_ids - name -> id.
+    strain_indptr, strain_indices - CSR of strain -> vaccines.
+    vaccine_indptr, vaccine_indices - CSR of vaccine -> strains.
+    The CSR arrays are int32 buffers; neighbours are returned as
+    zero-copy memoryview slices of them. has_neighbour bisects
+    a copy of the indices with every row sorted, made on its
+    first use, the rows themselves keep their order.
+    """
+
+    def __init__(self, strain_names, vaccine_names,
+                 strain_indptr, strain_indices,
+                 vaccine_indptr, vaccine_indices):
+        """Initialise the graph from its string table and CSR arrays."""
+        self.n_strains = len(strain_names)
+        self.n_vaccines = len(vaccine_names)
+        self.names = list(strain_names) + list(vaccine_names)
+        self.strain_ids = {name: i for i, name in enumerate(strain_names)}
+        self.vaccine_ids = {name: i + self.n_strains
+                            for i, name in enumerate(vaccine_names)}
+        self.strain_indptr = strain_indptr
+        self.strain_indices = strain_indices
+        self.vaccine_indptr = vaccine_indptr
+        self.vaccine_indices = vaccine_indices
+        self._strain_view = memoryview(strain_indices)
+        self._vaccine_view = memoryview(vaccine_indices)
+        self._strain_sorted = None
+        self._vaccine_sorted = None
+
+    @classmethod
+    def from_edges(cls, strain_names, vaccine_names, strains, vaccines):
+        """
+        Build the graph from parallel edge arrays.
+        :param strain_names: strain string table (id -> name).
+        :param vaccine_names: vaccine string table (id -> name).
+        :param strains: strain id (0 based) of every edge.
+        :param vaccines: vaccine id (0 based) of every edge.
+        """
+        n_strains = len(strain_names)
+        strain_indptr, strain_indices = _build_csr(
+            n_strains, strains, _int32_array(v + n_strains
+                                             for v in vaccines))
+        vaccine_indptr, vaccine_indices = _build_csr(
+            len(vaccine_names), vaccines, strains)
+        return cls(strain_names, vaccine_names,
+                   strain_indptr, strain_indices,
+                   vaccine_indptr, vaccine_indices)
+
+    @classmethod
+    def from_parser(cls, parser):
+        """
+        Build the graph straight from an InputParser, without
+        creating any Vertex.
+        :param parser: InputParser of the input file.
+        """
+        strains = _int32_array()
+        vaccines = _int32_array()
+        for strain_id, vaccine_ids in parser:
+            strains.extend([strain_id] * len(vaccine_ids))
+            vaccines.extend(vaccine_ids)
+        return cls.from_edges(parser.strain_names, parser.vaccine_names,
+                              strains, vaccines)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build the graph from the adjacency of an Immunization,
+        keeping its vertex and neighbour order.
+        :param graph: Immunization to compact.
+        """
+        strain_list = [x for x in graph if x.type == 'strain']
+        vaccine_list = [x for x in graph if x.type == 'vaccine']
+        ids = {x: i for i, x in enumerate(strain_list + vaccine_list)}
+
+        def csr(vertices):
+            indptr = _int32_array([0])
+            indices = _int32_array()
+            for x in vertices:
+                indices.extend(ids[y] for y in graph.adjacency[x])
+                indptr.append(len(indices))
+            return indptr, indices
+
+        return cls([x.name for x in strain_list],
+                   [x.name for x in vaccine_list],
+                   *csr(strain_list), *csr(vaccine_list))
+
+    def __len__(self):
+        return len(self.names)
+
+    def node(self, name, vtx_type):
+        """
+        Id of a vertex.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :return: the id, None if absent.
+        """
+        if vtx_type == 'strain':
+            return self.strain_ids.get(name)
+        return self.vaccine_ids.get(name)
+
+    def node_type(self, node):
+        """'strain' or 'vaccine' depending on the id."""
+        return 'strain' if node < self.n_strains else 'vaccine'
+
+    def neighbours(self, node):
+        """
+        Neighbour ids of a vertex.
+        :param node: Vertex id.
+        :return: memoryview over the CSR indices.
+        """
+        if node < self.n_strains:
+            indptr = self.strain_indptr
+            return self._strain_view[indptr[node]:indptr[node + 1]]
+        node -= self.n_strains
+        indptr = self.vaccine_indptr
+        return self._vaccine_view[indptr[node]:indptr[node + 1]]
+
+    def has_neighbour(self, node, other):
+        """
+        Check if two vertices are connected, in O(log degree).
+        :param node: Vertex id.
+        :param other: Vertex id.
+        """
+        if node < self.n_strains:
+            indptr = self.strain_indptr
+            if self._strain_sorted is None:
+                self._strain_sorted = _sorted_rows(indptr,
+                                                   self.strain_indices)
+            rows = self._strain_sorted
+        else:
+            node -= self.n_strains
+            indptr = self.vaccine_indptr
+            if self._vaccine_sorted is None:
+                self._vaccine_sorted = _sorted_rows(indptr,
+                                                    self.vaccine_indices)
+            rows = self._vaccine_sorted
+        hi = indptr[node + 1]
+        i = bisect_left(rows, other, indptr[node], hi)
+        return i < hi and rows[i] == other
+
+    def degree(self, node):
+        """Number of neighbours of a vertex."""
+        if node < self.n_strains:
+            indptr = self.strain_indptr
+        else:
+            node -= self.n_strains
+            indptr = self.vaccine_indptr
+        return indptr[node + 1] - indptr[node]
+
+    def edge_count(self):
+        """Number of (strain, vaccine) edges."""
+        return len(self.strain_indices)
+
+    def nbytes(self):
+        """Size in bytes of the CSR arrays."""
+        return sum(a.itemsize * len(a) for a in (
+            self.strain_indptr, self.strain_indices,
+            self.vaccine_indptr, self.vaccine_indices))
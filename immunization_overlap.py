@@ -0,0 +1,151 @@
+import csv
+from collections import defaultdict
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+
+class OverlapMatrix:
+    """
+    Number of strains shared by every pair of vaccines, i.e.
+    A.A^T where A is the vaccine x strain incidence matrix.
+    Initialised using :
+    vaccine_names - row/column index -> vaccine name.
+    counts - the symmetric matrix, a scipy.sparse CSR matrix
+             when SciPy is installed, otherwise a dict
+             row -> {column: count}. The diagonal holds the
+             number of strains of each vaccine.
+    The matrix can follow the changes of the graph through
+    update, which moves the counts to the dict storage.
+    """
+
+    def __init__(self, vaccine_names, counts):
+        """Initialise the matrix from its names and counts."""
+        self.vaccine_names = list(vaccine_names)
+        self.index = {name: i for i, name in enumerate(vaccine_names)}
+        self.counts = counts
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Compute the matrix from the vaccine -> strains CSR of
+        a CompactGraph, which is the incidence matrix A itself.
+        :param compact: CompactGraph of the graph.
+        """
+        names = compact.names[compact.n_strains:]
+        if sparse is not None:
+            indptr = np.frombuffer(compact.vaccine_indptr, dtype=np.intc)
+            indices = np.frombuffer(compact.vaccine_indices, dtype=np.intc)
+            incidence = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.int32), indices, indptr),
+                shape=(compact.n_vaccines, compact.n_strains))
+            return cls(names, (incidence @ incidence.T).tocsr())
+
+        # pure Python fallback, one pass over the strains
+        counts = defaultdict(lambda: defaultdict(int))
+        offset = compact.n_strains
+        for strain in range(compact.n_strains):
+            row = [v - offset for v in compact.neighbours(strain)]
+            for i, a in enumerate(row):
+                counts[a][a] += 1
+                for b in row[i + 1:]:
+                    counts[a][b] += 1
+                    counts[b][a] += 1
+        return cls(names, {a: dict(row) for a, row in counts.items()})
+
+    def shared(self, vacA, vacB):
+        """
+        Number of strains shared by two vaccines, in O(1).
+        :param vacA: Vaccine-A name
+        :param vacB: Vaccine-B name
+        :return: the count, None if a vaccine is unknown.
+        """
+        a = self.index.get(vacA)
+        b = self.index.get(vacB)
+        if a is None or b is None:
+            return None
+        if not isinstance(self.counts, dict):
+            return int(self.counts[a, b])
+        return self.counts.get(a, {}).get(b, 0)
+
+    def add_vaccine(self, vaccine):
+        """
+        Add a row and a column for a new vaccine.
+        :param vaccine: Vaccine name.
+        :return: its index.
+        """
+        a = self.index.get(vaccine)
+        if a is None:
+            self._to_dict()
+            a = self.index[vaccine] = len(self.vaccine_names)
+            self.vaccine_names.append(vaccine)
+        return a
+
+    def update(self, vaccine, others, delta):
+        """
+        Account for a strain gained or lost by a vaccine, in
+        time proportional to the number of vaccines of that
+        strain.
+        :param vaccine: Vaccine name.
+        :param others: names of the other vaccines of the strain.
+        :param delta: 1 if the strain was gained, -1 if lost.
+        """
+        self._to_dict()
+        a = self.add_vaccine(vaccine)
+        self._add(a, a, delta)
+        for other in others:
+            b = self.add_vaccine(other)
+            self._add(a, b, delta)
+            self._add(b, a, delta)
+
+    def _add(self, a, b, delta):
+        """Add delta to one count of the dict storage."""
+        row = self.counts.setdefault(a, dict())
+        count = row.get(b, 0) + delta
+        if count:
+            row[b] = count
+        else:
+            del row[b]
+
+    def _to_dict(self):
+        """Move the counts of a sparse matrix to a dict."""
+        if isinstance(self.counts, dict):
+            return
+        matrix = self.counts.tocsr()
+        counts = dict()
+        for a in range(matrix.shape[0]):
+            start, end = matrix.indptr[a], matrix.indptr[a + 1]
+            if start < end:
+                counts[a] = dict(zip(matrix.indices[start:end].tolist(),
+                                     matrix.data[start:end].tolist()))
+        self.counts = counts
+
+    def triples(self):
+        """
+        Non zero entries of the upper triangle.
+        :return: generator of (vaccine A, vaccine B, count).
+        """
+        names = self.vaccine_names
+        if not isinstance(self.counts, dict):
+            upper = sparse.triu(self.counts, k=1).tocoo()
+            for a, b, count in zip(upper.row, upper.col, upper.data):
+                yield names[a], names[b], int(count)
+            return
+        for a in sorted(self.counts):
+            for b, count in sorted(self.counts[a].items()):
+                if b > a:
+                    yield names[a], names[b], count
+
+    def to_csv(self, path):
+        """
+        Export the shared strain counts of all related pairs.
+        :param path: path of the CSV file written.
+        """
+        with open(path, "w", newline="") as fout:
+            writer = csv.writer(fout)
+            writer.writerow(["vaccine_a", "vaccine_b", "shared_strains"])
+            writer.writerows(self.triples())
@@ -0,0 +1,153 @@
+import mmap
+import os
+import time
+
+# bytes stripped around the names, those of bytes.strip()
+_SPACES = frozenset(b" \t\n\r\x0b\x0c")
+
+
+class InputParser:
+    """
+    Memory-mapped parser for the inputPS16.txt layout:
+    one strain per line followed by '/'-separated vaccines,
+        strain / vaccine / vaccine
+    The delimiters are located directly on the mapped bytes
+    and every name is interned into an integer id, looked up
+    through a zero-copy view of the map. A name is copied and
+    decoded into a str only the first time it is seen.
+    Initialised using the path of the file to parse, the
+    string tables are filled while iterating :
+    strain_names / vaccine_names - id -> name.
+    strain_ids / vaccine_ids - encoded name -> id.
+    """
+
+    def __init__(self, input_file):
+        """Initialise a parser for input_file."""
+        self.input_file = input_file
+        self.strain_ids = dict()
+        self.vaccine_ids = dict()
+        self.strain_names = list()
+        self.vaccine_names = list()
+        self.bytes_parsed = 0
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self.records()
+
+    @staticmethod
+    def _intern(token, ids, names):
+        """
+        Register a name seen for the first time.
+        :param token: name as a slice of the mapped file.
+        :param ids: bytes -> id table.
+        :param names: id -> str table.
+        :return: the id given to token.
+        """
+        token = bytes(token)
+        idx = ids[token] = len(names)
+        names.append(token.decode('utf-8'))
+        return idx
+
+    def records(self):
+        """
+        Parse the file lazily.
+        :return: generator of (strain id, list of vaccine ids),
+                 one per non blank line.
+        """
+        self.bytes_parsed = 0
+        self.elapsed = 0.0
+        # only the time spent parsing is accounted, not the
+        # time the consumer holds the generator suspended
+        start_time = time.perf_counter()
+        with open(self.input_file, 'rb') as fi:
+            size = os.fstat(fi.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                scan = self._scan(mm, view, size)
+                try:
+                    for strain, vaccines in scan:
+                        self.elapsed += time.perf_counter() - start_time
+                        yield strain, vaccines
+                        start_time = time.perf_counter()
+                finally:
+                    # the map cannot close while a view is exported,
+                    # closing the scan drops the last token view
+                    scan.close()
+                    view.release()
+                self.bytes_parsed = size
+        self.elapsed += time.perf_counter() - start_time
+
+    def _scan(self, mm, view, size):
+        """
+        Records of the mapped file. The '\n' and '/' offsets
+        are found with mm.find and the names trimmed by offset;
+        the memoryview slices between them hash like bytes, so
+        they are looked up in the intern tables as they are and
+        copied only for the names not seen before.
+        :param mm: mmap of the file.
+        :param view: read-only memoryview of mm.
+        :param size: size of the file.
+        :return: generator of (strain id, list of vaccine ids).
+        """
+        strain_ids = self.strain_ids
+        vaccine_ids = self.vaccine_ids
+        intern = self._intern
+        find = mm.find
+        spaces = _SPACES
+        pos = 0
+        while pos < size:
+            eol = find(b"\n", pos)
+            if eol < 0:
+                eol = size
+            ids, names = strain_ids, self.strain_names
+            strain = None
+            vaccines = []
+            while pos <= eol:
+                end = find(b"/", pos, eol)
+                if end < 0:
+                    end = eol
+                start, stop = pos, end
+                pos = end + 1
+                while start < stop and mm[start] in spaces:
+                    start += 1
+                while stop > start and mm[stop - 1] in spaces:
+                    stop -= 1
+                if start == stop:
+                    if strain is None:
+                        # no strain, skip the line
+                        pos = eol + 1
+                    continue
+                token = view[start:stop]
+                idx = ids.get(token)
+                if idx is None:
+                    idx = intern(token, ids, names)
+                if strain is None:
+                    strain = idx
+                    ids, names = vaccine_ids, self.vaccine_names
+                else:
+                    vaccines.append(idx)
+            if strain is not None:
+                self.bytes_parsed = pos
+                yield strain, vaccines
+
+    def release(self):
+        """
+        Drop the string tables once the graph is built,
+        keeping only the parse statistics.
+        """
+        self.strain_ids = dict()
+        self.vaccine_ids = dict()
+        self.strain_names = list()
+        self.vaccine_names = list()
+
+    def throughput(self):
+        """Parse throughput in MB/s of the last pass."""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_parsed / self.elapsed / 1e6
+
+    def __str__(self):
+        return "Parsed " + str(self.bytes_parsed) + " bytes in " + \
+               f"{self.elapsed:.6f}s ({self.throughput():.2f} MB/s)"
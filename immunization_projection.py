@@ -0,0 +1,169 @@
+from collections import defaultdict
+
+from immunization_search import bidirectional_bfs
+
+# strains linked to more vaccines than this are not expanded
+# into vaccine pairs, they would add degree^2 entries
+MAX_STRAIN_DEGREE = 64
+
+
+class VaccineProjection:
+    """
+    Projection of the strain/vaccine graph on the vaccines:
+    two vaccines are adjacent when they share a strain, and
+    the edge carries the list of those strains.
+    commonStrain is then one lookup and findVaccineConnect a
+    search over vaccines only, half as deep.
+    Initialised using :
+    graph_neighbours - neighbours function of the graph, used
+                       to walk the hub strains.
+    max_strain_degree - memory budget: a strain linked to
+                        more vaccines becomes a hub, kept in
+                        hub_strains instead of being expanded
+                        into pairs.
+    Built with :
+    shared - vaccine -> {vaccine: list of shared strains},
+             strains in the order they became shared.
+    hub_strains - vaccine -> ordered set (dict) of its hub
+                  strains.
+    hubs - set of the hub strains.
+    Vertices are the handles of the graph.
+    """
+
+    def __init__(self, graph_neighbours, max_strain_degree=MAX_STRAIN_DEGREE):
+        """Initialise an empty projection."""
+        self.graph_neighbours = graph_neighbours
+        self.max_strain_degree = max_strain_degree
+        self.shared = defaultdict(dict)
+        self.hub_strains = defaultdict(dict)
+        self.hubs = set()
+
+    @classmethod
+    def from_graph(cls, graph, max_strain_degree=MAX_STRAIN_DEGREE):
+        """
+        Project the edges of an Immunization graph.
+        :param graph: Immunization to project.
+        :param max_strain_degree: see VaccineProjection.
+        """
+        projection = cls(graph._neighbours, max_strain_degree)
+        for strain in graph._nodes('strain'):
+            vaccines = list(graph._neighbours(strain))
+            if len(vaccines) > max_strain_degree:
+                projection._add_hub(strain, vaccines)
+                continue
+            for i, vaccine in enumerate(vaccines):
+                projection._link(strain, vaccine, vaccines[:i])
+        return projection
+
+    def __len__(self):
+        """Number of vaccine pairs sharing a non hub strain."""
+        return sum(len(row) for row in self.shared.values()) // 2
+
+    def _link(self, strain, vaccine, others):
+        """Record that vaccine shares strain with others."""
+        shared = self.shared
+        for other in others:
+            shared[vaccine].setdefault(other, []).append(strain)
+            shared[other].setdefault(vaccine, []).append(strain)
+
+    def _add_hub(self, strain, vaccines):
+        """Record a hub strain linked to vaccines."""
+        self.hubs.add(strain)
+        for vaccine in vaccines:
+            self.hub_strains[vaccine][strain] = None
+
+    def _unlink(self, strain, vaccine, others):
+        """Forget that vaccine shares strain with others."""
+        shared = self.shared
+        for a, b in ((vaccine, other) for other in others):
+            for x, y in ((a, b), (b, a)):
+                strains = shared[x][y]
+                strains.remove(strain)
+                if not strains:
+                    del shared[x][y]
+                    if not shared[x]:
+                        del shared[x]
+
+    def add_edge(self, strain, vaccine, others):
+        """
+        Update the projection for a new edge, in time
+        proportional to the degree of the strain.
+        :param strain: handle of the strain.
+        :param vaccine: handle of the vaccine.
+        :param others: handles of the other vaccines of strain.
+        """
+        others = list(others)
+        if strain in self.hubs:
+            self.hub_strains[vaccine][strain] = None
+        elif len(others) + 1 > self.max_strain_degree:
+            # over budget: drop the pairs of the strain
+            for i, other in enumerate(others):
+                self._unlink(strain, other, others[:i])
+            self._add_hub(strain, others + [vaccine])
+        else:
+            self._link(strain, vaccine, others)
+
+    def remove_edge(self, strain, vaccine, others):
+        """
+        Update the projection for a removed edge.
+        :param strain: handle of the strain.
+        :param vaccine: handle of the vaccine.
+        :param others: handles of the vaccines left to strain.
+        """
+        if strain in self.hubs:
+            hub_strains = self.hub_strains[vaccine]
+            del hub_strains[strain]
+            if not hub_strains:
+                del self.hub_strains[vaccine]
+        else:
+            self._unlink(strain, vaccine, others)
+
+    def common(self, vaccine_a, vaccine_b):
+        """
+        Strains shared by two vaccines: those of their
+        projected edge, then the hub strains.
+        :param vaccine_a: handle of the first vaccine.
+        :param vaccine_b: handle of the second vaccine.
+        :return: list of strain handles.
+        """
+        common = list(self.shared.get(vaccine_a, {}).get(vaccine_b, ()))
+        if vaccine_a in self.hub_strains and vaccine_b in self.hub_strains:
+            hubs_b = self.hub_strains[vaccine_b]
+            common += [s for s in self.hub_strains[vaccine_a] if s in hubs_b]
+        return common
+
+    def neighbours(self, vaccine):
+        """
+        Vaccines sharing at least one strain with a vaccine.
+        :param vaccine: handle of the vaccine.
+        :return: iterable of vaccine handles, possibly repeated
+                 when the vaccine has hub strains.
+        """
+        projected = self.shared.get(vaccine, {})
+        if vaccine not in self.hub_strains:
+            return projected
+        conns = list(projected)
+        for strain in self.hub_strains[vaccine]:
+            conns.extend(self.graph_neighbours(strain))
+        return conns
+
+    def shortest_chain(self, start, end, max_hops=None):
+        """
+        Shortest vaccine > strain > vaccine > ... chain between
+        two vaccines, searched over the projection.
+        :param start: handle of the first vaccine.
+        :param end: handle of the second vaccine.
+        :param max_hops: maximum length of the chain in edges
+                         of the strain/vaccine graph.
+        :return: list of handles from start to end, None if
+                 they are not connected within max_hops.
+        """
+        hops = None if max_hops is None else max_hops // 2
+        path = bidirectional_bfs(start, end, self.neighbours, hops)
+        if path is None:
+            return None
+        chain = [start]
+        for a, b in zip(path, path[1:]):
+            chain.append(self.common(a, b)[0])
+            chain.append(b)
+        return chain
@@ -0,0 +1,279 @@
+from array import array
+from collections import deque
+
+
+def _expand_level(frontier, dist, other_dist, neighbours, depth):
+    """
+    Expand every node of one BFS level.
+    :param frontier: deque holding the current level.
+    :param dist: distances of the nodes reached by this side.
+    :param other_dist: distances of the nodes reached by the
+                       other side.
+    :param neighbours: function node -> iterable of nodes.
+    :param depth: distance of the level being discovered.
+    :return: list of the new nodes also reached by the other side.
+    """
+    meets = []
+    for _ in range(len(frontier)):
+        node = frontier.popleft()
+        for conn in neighbours(node):
+            if conn in dist:
+                continue
+            dist[conn] = depth
+            frontier.append(conn)
+            if conn in other_dist:
+                meets.append(conn)
+    return meets
+
+
+def _first_path(start, meets, dist_fwd, dist_bwd, neighbours):
+    """
+    Rebuild the first shortest path from start, i.e. the one
+    following the earliest neighbour at every step, which is
+    also the path a plain BFS from start discovers first.
+    :param start: start node.
+    :param meets: nodes where both searches met.
+    :param dist_fwd: distances from start.
+    :param dist_bwd: distances from the end node.
+    :param neighbours: function node -> iterable of nodes.
+    """
+    depth = dist_fwd[meets[0]]
+    # nodes of the start side lying on a shortest path, per level
+    on_path = [None] * (depth + 1)
+    on_path[depth] = set(meets)
+    for level in range(depth - 1, 0, -1):
+        on_path[level] = {conn for node in on_path[level + 1]
+                          for conn in neighbours(node)
+                          if dist_fwd.get(conn) == level}
+    path = [start]
+    node = start
+    for level in range(1, depth + 1):
+        node = next(x for x in neighbours(node) if x in on_path[level])
+        path.append(node)
+    for level in range(dist_bwd[node] - 1, -1, -1):
+        node = next(x for x in neighbours(node)
+                    if dist_bwd.get(x) == level)
+        path.append(node)
+    return path
+
+
+def bidirectional_bfs(start, end, neighbours, max_hops=None, probe=None):
+    """
+    Find a shortest path between two nodes by searching from
+    both ends and meeting in the middle. The smaller frontier
+    is expanded one full level at a time and only the distance
+    of every node is kept, no path is ever copied.
+    The path returned is the one a plain BFS from start would
+    find, so the answer does not depend on the search order.
+    :param start: start node.
+    :param end: end node.
+    :param neighbours: function node -> iterable of nodes.
+    :param max_hops: maximum path length in edges,
+                     None for no limit.
+    :param probe: optional Probe counting the work done.
+    :return: list of nodes from start to end, None if they
+             are not connected within max_hops.
+    """
+    if start == end:
+        return [start]
+    if probe is not None:
+        neighbours = probe.neighbours(neighbours)
+    dist_fwd = {start: 0}
+    dist_bwd = {end: 0}
+    frontier_fwd = deque([start])
+    frontier_bwd = deque([end])
+    depth_fwd = depth_bwd = 0
+    while frontier_fwd and frontier_bwd:
+        if max_hops is not None and depth_fwd + depth_bwd >= max_hops:
+            return None
+        if len(frontier_fwd) <= len(frontier_bwd):
+            depth_fwd += 1
+            meets = _expand_level(frontier_fwd, dist_fwd, dist_bwd,
+                                  neighbours, depth_fwd)
+        else:
+            depth_bwd += 1
+            meets = _expand_level(frontier_bwd, dist_bwd, dist_fwd,
+                                  neighbours, depth_bwd)
+        if probe is not None:
+            probe.queue(len(frontier_fwd) + len(frontier_bwd))
+        if meets:
+            return _first_path(start, meets, dist_fwd, dist_bwd,
+                               neighbours)
+    return None
+
+
+def bfs_tree(start, neighbours, max_hops=None, targets=None, probe=None):
+    """
+    Breadth-first traversal from start recording the parent
+    each node was first discovered from. Used to answer many
+    queries sharing the same start node with one traversal.
+    :param start: start node.
+    :param neighbours: function node -> iterable of nodes.
+    :param max_hops: maximum depth in edges, None for no limit.
+    :param targets: optional nodes of interest, the traversal
+                    stops as soon as all of them are reached.
+    :param probe: optional Probe counting the work done.
+    :return: dict node -> parent node (None for start).
+    """
+    if probe is not None:
+        neighbours = probe.neighbours(neighbours)
+    parents = {start: None}
+    remaining = None
+    if targets is not None:
+        remaining = set(targets)
+        remaining.discard(start)
+        if not remaining:
+            return parents
+    frontier = deque([start])
+    hops = 0
+    while frontier and (max_hops is None or hops < max_hops):
+        hops += 1
+        for _ in range(len(frontier)):
+            node = frontier.popleft()
+            for conn in neighbours(node):
+                if conn in parents:
+                    continue
+                parents[conn] = node
+                frontier.append(conn)
+                if remaining is not None:
+                    remaining.discard(conn)
+                    if not remaining:
+                        return parents
+        if probe is not None:
+            probe.queue(len(frontier))
+    return parents
+
+
+def tree_path(parents, end):
+    """
+    Path from the root of a bfs_tree to end.
+    :param parents: dict returned by bfs_tree.
+    :param end: end node.
+    :return: list of nodes, None if end was not reached.
+    """
+    if end not in parents:
+        return None
+    path = []
+    while end is not None:
+        path.append(end)
+        end = parents[end]
+    return path[::-1]
+
+
+def iter_bfs(start, neighbours, max_depth=None):
+    """
+    Lazy breadth-first traversal from start. Nodes are
+    produced as they are discovered, so stopping the
+    iteration stops the traversal.
+    :param start: start node.
+    :param neighbours: function node -> iterable of nodes.
+    :param max_depth: maximum depth in edges, None for no limit.
+    :return: generator of (node, depth), start first.
+    """
+    visited = {start}
+    frontier = deque([(start, 0)])
+    while frontier:
+        node, depth = frontier.popleft()
+        yield node, depth
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for conn in neighbours(node):
+            if conn not in visited:
+                visited.add(conn)
+                frontier.append((conn, depth + 1))
+
+
+def iter_dfs(start, neighbours, max_depth=None):
+    """
+    Lazy depth-first traversal from start, in preorder. The
+    neighbours of a node are only read when the traversal
+    first goes down from it.
+    :param start: start node.
+    :param neighbours: function node -> iterable of nodes.
+    :param max_depth: maximum depth in edges, None for no limit.
+    :return: generator of (node, depth), start first.
+    """
+    visited = {start}
+    yield start, 0
+    if max_depth is not None and max_depth <= 0:
+        return
+    stack = [iter(neighbours(start))]
+    while stack:
+        for conn in stack[-1]:
+            if conn not in visited:
+                visited.add(conn)
+                yield conn, len(stack)
+                if max_depth is None or len(stack) < max_depth:
+                    stack.append(iter(neighbours(conn)))
+                break
+        else:
+            stack.pop()
+
+
+def multi_source_bfs(sources, neighbours, max_hops=None):
+    """
+    Level-synchronous breadth-first traversal from many nodes
+    at once: every node is reached once, from its nearest
+    source (the first one listed on a tie).
+    :param sources: iterable of start nodes.
+    :param neighbours: function node -> iterable of nodes.
+    :param max_hops: maximum depth in edges, None for no limit.
+    :return: dict node -> (distance, source) of the nodes
+             reached, in the order they were reached.
+    """
+    reached = dict()
+    frontier = []
+    for source in sources:
+        if source not in reached:
+            reached[source] = (0, source)
+            frontier.append(source)
+    depth = 0
+    while frontier and (max_hops is None or depth < max_hops):
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            source = reached[node][1]
+            for conn in neighbours(node):
+                if conn not in reached:
+                    reached[conn] = (depth, source)
+                    next_frontier.append(conn)
+        frontier = next_frontier
+    return reached
+
+
+def multi_source_bfs_array(sources, neighbours, n_nodes, max_hops=None):
+    """
+    multi_source_bfs over the integer ids 0..n_nodes-1 of a
+    frozen graph, with flat int arrays for the distances,
+    sources and frontiers instead of dicts and lists.
+    :param sources: iterable of start ids.
+    :param neighbours: function id -> iterable of ids.
+    :param n_nodes: number of ids.
+    :param max_hops: maximum depth in edges, None for no limit.
+    :return: (distance, source, reached) arrays, distance and
+             source being -1 for the ids not reached, and
+             reached holding the ids reached in order.
+    """
+    distance = array('i', [-1]) * n_nodes
+    origin = array('i', [-1]) * n_nodes
+    frontier = array('i')
+    for source in sources:
+        if distance[source] < 0:
+            distance[source] = 0
+            origin[source] = source
+            frontier.append(source)
+    reached = array('i', frontier)
+    depth = 0
+    while frontier and (max_hops is None or depth < max_hops):
+        depth += 1
+        next_frontier = array('i')
+        for node in frontier:
+            source = origin[node]
+            for conn in neighbours(node):
+                if distance[conn] < 0:
+                    distance[conn] = depth
+                    origin[conn] = source
+                    next_frontier.append(conn)
+        reached.extend(next_frontier)
+        frontier = next_frontier
+    return distance, origin, reached
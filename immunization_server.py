@@ -0,0 +1,220 @@
+import asyncio
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from main import split_prompt
+
+# requests accepted but not answered yet, over all clients
+MAX_IN_FLIGHT = 256
+# prompts answered by a traversal, run in worker processes
+HEAVY_PROMPTS = frozenset({'findVaccineConnect'})
+# longest request line accepted, in bytes
+MAX_LINE = 1 << 16
+
+# graph read by the forked workers of QueryServer
+_worker_graph = None
+
+
+def _answer_in_worker(function, args, max_hops):
+    """Answer a heavy prompt in a worker process."""
+    return _worker_graph.answer(function, args, max_hops)
+
+
+class QueryServer:
+    """
+    Serve the prompts of promptsPS16.txt over a socket, on a
+    graph loaded once.
+    Every request is one prompt line, e.g.
+        commonStrain: Pfizer : Moderna
+    and every response one JSON line
+        {"id": 1, "ok": true, "function": "commonStrain",
+         "args": ["Pfizer", "Moderna"], "result": [...],
+         "output": "..."}
+    or {"id": 1, "ok": false, "error": "..."}, where id is the
+    number of the request on its connection. Clients may send
+    many requests without waiting: responses are written as
+    soon as they are ready, so they can come out of order.
+    The cheap prompts are answered on the event loop, while
+    the traversals of HEAVY_PROMPTS run in a pool of forked
+    worker processes sharing the graph copy-on-write, so a
+    long search never holds up the lookups. At most
+    max_in_flight requests are pending at once, max_heavy of
+    them heavy; past that the server stops reading the
+    connections, which pushes back on the clients.
+    Initialised using :
+    graph - Immunization answering the prompts, not to be
+            modified while serving.
+    max_in_flight - limit of the pending requests.
+    max_heavy - limit of the pending heavy requests, half of
+                max_in_flight by default.
+    workers - number of worker processes, 0 to answer the
+              heavy prompts on the event loop too.
+    max_hops - max_hops of findVaccineConnect.
+    """
+
+    def __init__(self, graph, max_in_flight=MAX_IN_FLIGHT, max_heavy=None,
+                 workers=1, max_hops=4):
+        """Initialise a server of graph, see start."""
+        if max_heavy is None:
+            max_heavy = max(1, max_in_flight // 2)
+        self.graph = graph
+        self.max_in_flight = max_in_flight
+        self.max_heavy = max_heavy
+        self.workers = workers
+        self.max_hops = max_hops
+        self._slots = None
+        self._heavy_slots = None
+        self._executor = None
+        self._server = None
+        self._connections = dict()
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """
+        Start listening.
+        :param path: path of a Unix socket, None to use TCP.
+        :param host: TCP host.
+        :param port: TCP port, 0 for any free port.
+        :return: the asyncio Server, see its sockets for the
+                 address actually bound.
+        """
+        global _worker_graph
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._heavy_slots = asyncio.Semaphore(self.max_heavy)
+        if self.workers > 0 and 'fork' in mp.get_all_start_methods():
+            _worker_graph = self.graph
+            self.graph.sink.flush()
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=mp.get_context('fork'))
+            # fork the workers now, before any socket they could
+            # inherit and keep open is created
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, int)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path, limit=MAX_LINE)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, host, port, limit=MAX_LINE)
+        return self._server
+
+    async def close(self):
+        """Stop listening and shut the workers down."""
+        global _worker_graph
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            _worker_graph = None
+
+    async def _handle(self, reader, writer):
+        """Read the requests of one connection."""
+        lock = asyncio.Lock()
+        tasks = set()
+        seq = 0
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # line over MAX_LINE, the stream cannot resync
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                seq += 1
+                try:
+                    prompt = split_prompt(line.decode('utf-8'))
+                except (UnicodeDecodeError, ValueError) as error:
+                    await self._send(writer, lock, {
+                        "id": seq, "ok": False, "error": str(error)})
+                    continue
+                heavy = prompt[0] in HEAVY_PROMPTS
+                if heavy:
+                    await self._heavy_slots.acquire()
+                await self._slots.acquire()
+                task = asyncio.create_task(
+                    self._respond(writer, lock, seq, prompt, heavy))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _respond(self, writer, lock, seq, prompt, heavy):
+        """Answer one request and release its slots."""
+        function, args = prompt
+        try:
+            if heavy and self._executor is not None:
+                output, result = await asyncio.get_running_loop() \
+                    .run_in_executor(self._executor, _answer_in_worker,
+                                     function, args, self.max_hops)
+            else:
+                output, result = self.graph.answer(function, args,
+                                                   self.max_hops)
+            response = {"id": seq, "ok": True, "function": function,
+                        "args": args, "result": result, "output": output}
+        except Exception as error:
+            response = {"id": seq, "ok": False,
+                        "error": type(error).__name__ + ": " + str(error)}
+        finally:
+            self._slots.release()
+            if heavy:
+                self._heavy_slots.release()
+        await self._send(writer, lock, response)
+
+    @staticmethod
+    async def _send(writer, lock, response):
+        """Write one response, waiting for the client to read."""
+        async with lock:
+            if writer.is_closing():
+                return
+            writer.write(json.dumps(response).encode('utf-8') + b"\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+def serve(graph, address, **kwargs):
+    """
+    Serve a graph until interrupted.
+    :param graph: Immunization answering the prompts.
+    :param address: 'host:port' for TCP, otherwise the path
+                    of a Unix socket.
+    :param kwargs: options of QueryServer.
+    """
+    host, _, port = address.rpartition(':')
+    unix = not port.isdigit()
+
+    async def run():
+        server = QueryServer(graph, **kwargs)
+        if unix:
+            listening = await server.start(path=address)
+        else:
+            listening = await server.start(host=host or '127.0.0.1',
+                                           port=int(port))
+        for sock in listening.sockets:
+            print("Serving on", sock.getsockname())
+        try:
+            await listening.serve_forever()
+        finally:
+            await server.close()
+            if unix and os.path.exists(address):
+                os.unlink(address)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,123 @@
+import random
+import zlib
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# number of hash functions of a signature
+NUM_PERM = 64
+# number of LSH bands, NUM_PERM must be a multiple of it;
+# bands of one value make any shared minimum a candidate, as
+# the most similar vaccines share few of their strains (top
+# Jaccard index around 0.05 on the generated graphs)
+BANDS = 64
+# Mersenne prime modulus of the hash functions, small enough
+# for a * hash + b to fit in 64 bits
+_PRIME = (1 << 31) - 1
+
+
+def _strain_hash(name):
+    """Stable 32 bits hash of a strain name."""
+    return zlib.crc32(name.encode('utf-8'))
+
+
+class MinHashIndex:
+    """
+    MinHash signatures of the strain sets of the vaccines and
+    an LSH index over them, to find the vaccines of similar
+    strain coverage (Jaccard) without scanning them all.
+    A signature holds, for num_perm hash functions, the
+    minimum hash of the strains of a vaccine; two signatures
+    agree on a function with probability the Jaccard index of
+    the two sets. Signatures are cut in bands of
+    num_perm / bands values and vaccines agreeing on a whole
+    band share a bucket: pairs of similarity s become
+    candidates with probability 1 - (1 - s^r)^bands, r being
+    the band size. More bands find more (and less similar)
+    candidates, more values per signature sharpen the cut.
+    Initialised using :
+    num_perm - number of hash functions.
+    bands - number of bands.
+    seed - seed of the hash functions.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        """Initialise an empty index."""
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rnd = random.Random(seed)
+        self.perms = [(rnd.randrange(1, _PRIME), rnd.randrange(_PRIME))
+                      for _ in range(num_perm)]
+        if np is not None:
+            self._a, self._b = (np.array(x, dtype=np.uint64)
+                                for x in zip(*self.perms))
+        self.signatures = dict()
+        self.buckets = defaultdict(list)
+
+    def threshold(self):
+        """Similarity at which pairs become likely candidates."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, strain_names):
+        """
+        MinHash signature of a set of strains.
+        :param strain_names: iterable of strain names.
+        :return: tuple of num_perm ints, all equal to the
+                 modulus for an empty set.
+        """
+        hashes = [_strain_hash(name) for name in strain_names]
+        if not hashes:
+            return (_PRIME,) * self.num_perm
+        if np is not None:
+            values = (np.outer(self._a, np.array(hashes, dtype=np.uint64)) +
+                      self._b[:, None]) % np.uint64(_PRIME)
+            return tuple(int(x) for x in values.min(axis=1))
+        signature = [_PRIME] * self.num_perm
+        for h in hashes:
+            signature = list(map(
+                min, signature, [(a * h + b) % _PRIME for a, b in self.perms]))
+        return tuple(signature)
+
+    def _bands(self, signature):
+        """Keys of the buckets of a signature, one per band."""
+        rows = self.rows
+        return [(i, signature[i * rows:(i + 1) * rows])
+                for i in range(self.bands)]
+
+    def add(self, vaccine, strain_names):
+        """
+        Index a vaccine.
+        :param vaccine: key of the vaccine.
+        :param strain_names: names of its strains.
+        """
+        signature = self.signature(strain_names)
+        self.signatures[vaccine] = signature
+        if signature[0] == _PRIME:
+            # no strain, similar to nothing
+            return
+        for band in self._bands(signature):
+            self.buckets[band].append(vaccine)
+
+    def candidates(self, vaccine):
+        """
+        Vaccines sharing at least one bucket with a vaccine.
+        :param vaccine: key of an indexed vaccine.
+        :return: list of keys, without vaccine itself.
+        """
+        found = dict()
+        for band in self._bands(self.signatures[vaccine]):
+            found.update(dict.fromkeys(self.buckets.get(band, ())))
+        found.pop(vaccine, None)
+        return list(found)
+
+    def estimate(self, vaccine_a, vaccine_b):
+        """Jaccard index estimated from two signatures."""
+        sig_a = self.signatures[vaccine_a]
+        sig_b = self.signatures[vaccine_b]
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / self.num_perm
@@ -0,0 +1,121 @@
+import sys
+
+# size of the write buffer of FileSink
+BUFFER_SIZE = 1 << 20
+
+
+class OutputSink:
+    """
+    Destination of the outputs of Immunization.
+    Subclasses implement write; flush and close are no-ops
+    unless the sink holds buffered data or a resource.
+    """
+
+    def write(self, text):
+        """
+        Write one output.
+        :param text: text to write.
+        """
+        raise NotImplementedError
+
+    def writelines(self, texts):
+        """
+        Write many outputs.
+        :param texts: iterable of texts.
+        """
+        for text in texts:
+            self.write(text)
+
+    def flush(self):
+        """Push any buffered output to its destination."""
+
+    def close(self):
+        """Flush and release the sink."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FileSink(OutputSink):
+    """
+    Buffered output appended to a file. The file is opened
+    once, on the first write, and written in large blocks.
+    """
+
+    def __init__(self, path, buffer_size=BUFFER_SIZE):
+        """
+        :param path: path of the output file.
+        :param buffer_size: size in bytes of the write buffer.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", buffering=self.buffer_size)
+        return self._file
+
+    def write(self, text):
+        self._open().write(text)
+
+    def writelines(self, texts):
+        self._open().writelines(texts)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MemorySink(OutputSink):
+    """Output captured in memory, see getvalue."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, text):
+        self._chunks.append(text)
+
+    def writelines(self, texts):
+        self._chunks.extend(texts)
+
+    def getvalue(self):
+        """All the output written so far."""
+        return "".join(self._chunks)
+
+    def clear(self):
+        """Forget the output written so far."""
+        self._chunks = []
+
+
+class StdoutSink(OutputSink):
+    """Output printed on the standard output."""
+
+    def write(self, text):
+        sys.stdout.write(text)
+
+    def writelines(self, texts):
+        sys.stdout.writelines(texts)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class NullSink(OutputSink):
+    """Output discarded, for benchmarks."""
+
+    def write(self, text):
+        pass
+
+    def writelines(self, texts):
+        for _ in texts:
+            pass
@@ -0,0 +1,181 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from immunization_components import ComponentIndex
+from immunization_csr import CompactGraph
+
+MAGIC = b"IMMSNAP\0"
+FORMAT_VERSION = 1
+# magic, format version, little endian flag, int size,
+# source mtime (ns), source size, source sha256,
+# strains, vaccines, edges, string table size, crc32 of the payload
+HEADER = struct.Struct("<8sHHI qQ32s QQQQI")
+ALIGN = 8
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is invalid, corrupt or stale."""
+
+
+def _padding(offset):
+    """Number of bytes to reach the next aligned offset."""
+    return -offset % ALIGN
+
+
+def source_info(source, with_hash=True):
+    """
+    Identity of a source file.
+    :param source: path of the source file, None for no source.
+    :param with_hash: also compute the sha256 of its content.
+    :return: (mtime in ns, size, sha256 digest).
+    """
+    if source is None:
+        return 0, 0, bytes(32)
+    stat = os.stat(source)
+    digest = bytes(32)
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(source, 'rb') as fi:
+            for block in iter(lambda: fi.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.digest()
+    return stat.st_mtime_ns, stat.st_size, digest
+
+
+def save_snapshot(compact, components, path, source=None):
+    """
+    Write a CompactGraph to a binary snapshot: a header, the
+    string table, the four CSR arrays and the flattened
+    component index, each aligned so they can be mapped back
+    without copy.
+    :param compact: CompactGraph to save.
+    :param components: ComponentIndex of compact.
+    :param path: path of the snapshot file.
+    :param source: path of the file the graph was read from,
+                   recorded to detect when it changes.
+    """
+    names = b"\0".join(name.encode('utf-8') for name in compact.names)
+    arrays = [array('i', a) for a in (
+        compact.strain_indptr, compact.strain_indices,
+        compact.vaccine_indptr, compact.vaccine_indices)]
+    arrays += components.flatten()
+    if arrays[0].itemsize != 4:
+        raise SnapshotError("Snapshots need 4 bytes C ints.")
+    chunks = [names, bytes(_padding(len(names)))]
+    chunks += [a.tobytes() for a in arrays]
+    checksum = 0
+    for chunk in chunks:
+        checksum = zlib.crc32(chunk, checksum)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, sys.byteorder == 'little',
+        arrays[0].itemsize, *source_info(source),
+        compact.n_strains, compact.n_vaccines, compact.edge_count(),
+        len(names), checksum)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as fout:
+        fout.write(header)
+        fout.write(bytes(_padding(len(header))))
+        fout.writelines(chunks)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """
+    Header fields of a snapshot.
+    :param path: path of the snapshot file.
+    :return: dict of the header fields.
+    """
+    with open(path, 'rb') as fi:
+        data = fi.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise SnapshotError("Snapshot " + path + " is truncated.")
+    fields = HEADER.unpack(data)
+    header = dict(zip(
+        ("magic", "version", "little_endian", "itemsize",
+         "source_mtime_ns", "source_size", "source_sha256",
+         "n_strains", "n_vaccines", "n_edges", "names_size",
+         "checksum"), fields))
+    if header["magic"] != MAGIC:
+        raise SnapshotError(path + " is not a snapshot.")
+    if header["version"] != FORMAT_VERSION:
+        raise SnapshotError("Unsupported snapshot version " +
+                            str(header["version"]) + ".")
+    return header
+
+
+def is_current(path, source, verify_hash=True):
+    """
+    Check that a snapshot was taken from the current content
+    of its source file: its mtime, size and sha256 must be
+    unchanged.
+    :param path: path of the snapshot file.
+    :param source: path of the source file.
+    :param verify_hash: also compare the content hashes, False
+                        to trust the mtime and size (an edit
+                        can leave both as they were).
+    """
+    try:
+        header = read_header(path)
+        mtime_ns, size, digest = source_info(source, verify_hash)
+    except (OSError, SnapshotError):
+        return False
+    if (mtime_ns, size) != (header["source_mtime_ns"],
+                            header["source_size"]):
+        return False
+    return not verify_hash or digest == header["source_sha256"]
+
+
+def load_snapshot(path, verify_checksum=True):
+    """
+    Map a snapshot back into a CompactGraph and its component
+    index. The arrays are memoryviews over the mapped file,
+    only the string table is decoded.
+    :param path: path of the snapshot file.
+    :param verify_checksum: check the crc32 of the payload.
+    :return: (CompactGraph, ComponentIndex).
+    """
+    header = read_header(path)
+    if header["itemsize"] != array('i').itemsize:
+        raise SnapshotError("Snapshot " + path + " was saved with " +
+                            str(header["itemsize"]) + " bytes ints.")
+    with open(path, 'rb') as fi:
+        mm = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mm)
+    offset = HEADER.size + _padding(HEADER.size)
+    n_strains = header["n_strains"]
+    n_vaccines = header["n_vaccines"]
+    n_edges = header["n_edges"]
+    names_size = header["names_size"]
+    n_nodes = n_strains + n_vaccines
+    counts = (n_strains + 1, n_edges, n_vaccines + 1, n_edges,
+              n_nodes, n_nodes)
+    payload_size = names_size + _padding(names_size) + 4 * sum(counts)
+    if len(buf) < offset + payload_size:
+        raise SnapshotError("Snapshot " + path + " is truncated.")
+    if verify_checksum and zlib.crc32(
+            buf[offset:offset + payload_size]) != header["checksum"]:
+        raise SnapshotError("Snapshot " + path + " is corrupt.")
+
+    names_blob = bytes(buf[offset:offset + names_size])
+    names = names_blob.decode('utf-8').split("\0") if names_blob else []
+    if len(names) != n_nodes:
+        raise SnapshotError("Snapshot " + path + " is corrupt.")
+    offset += names_size + _padding(names_size)
+
+    native = bool(header["little_endian"]) == (sys.byteorder == 'little')
+    arrays = []
+    for count in counts:
+        view = buf[offset:offset + 4 * count].cast('i')
+        if not native:
+            view = array('i', view.tobytes())
+            view.byteswap()
+        arrays.append(view)
+        offset += 4 * count
+    compact = CompactGraph(names[:n_strains], names[n_strains:], *arrays[:4])
+    return compact, ComponentIndex(*arrays[4:])
@@ -0,0 +1,138 @@
+import json
+import time
+from collections import defaultdict
+
+
+class Probe:
+    """
+    Measures of one query or phase, filled while it runs and
+    handed to its Instrumentation by done.
+    Counters :
+    expanded - vertices whose neighbours were read.
+    edges - edges scanned while reading them.
+    queue_max - high-water mark of the BFS queues, sampled at
+                the end of every level.
+    cached - the result came from the query cache.
+    """
+
+    def __init__(self, stats, name, args):
+        """Start measuring a query of stats."""
+        self.stats = stats
+        self.name = name
+        self.args = args
+        self.expanded = 0
+        self.edges = 0
+        self.queue_max = 0
+        self.cached = False
+        self.seconds = None
+        self._start = time.perf_counter()
+
+    def neighbours(self, neighbours):
+        """
+        Counting version of a neighbours function.
+        :param neighbours: function node -> sized iterable.
+        """
+        def counted(node):
+            conns = neighbours(node)
+            self.expanded += 1
+            self.edges += len(conns)
+            return conns
+        return counted
+
+    def queue(self, size):
+        """Record the size of the BFS queues."""
+        if size > self.queue_max:
+            self.queue_max = size
+
+    def done(self, seconds=None):
+        """
+        Stop measuring and record the probe.
+        :param seconds: elapsed time, measured since the probe
+                        was created if None.
+        """
+        if seconds is None:
+            seconds = time.perf_counter() - self._start
+        self.seconds = seconds
+        self.stats.record(self)
+
+    def as_dict(self):
+        """Measures as a dict, one line of the trace."""
+        return {"name": self.name, "args": list(self.args),
+                "seconds": self.seconds, "expanded": self.expanded,
+                "edges": self.edges, "queue_max": self.queue_max,
+                "cached": self.cached}
+
+
+class Instrumentation:
+    """
+    Opt-in collector of the measures of an Immunization
+    (see its stats attribute): wall time, vertices expanded,
+    edges scanned and queue high-water mark of every
+    commonStrain / findVaccineConnect, and the parse and
+    insert times of readInputfile.
+    Initialised using :
+    trace - optional path of a JSON lines file receiving one
+            line per probe.
+    The totals of every query or phase name are kept in
+    totals, see summary.
+    """
+
+    def __init__(self, trace=None):
+        """Initialise an empty collector."""
+        self.trace = trace
+        self._file = None
+        self.totals = defaultdict(lambda: {
+            "count": 0, "cached": 0, "seconds": 0.0, "max_seconds": 0.0,
+            "expanded": 0, "edges": 0, "queue_max": 0})
+
+    def probe(self, name, *args):
+        """
+        Start measuring a query or phase.
+        :param name: name of the query or phase.
+        :param args: its arguments, written to the trace.
+        :return: Probe, call its done method when finished.
+        """
+        return Probe(self, name, args)
+
+    def record(self, probe):
+        """
+        Add a finished probe to the totals and the trace.
+        :param probe: Probe to record.
+        """
+        total = self.totals[probe.name]
+        total["count"] += 1
+        total["cached"] += probe.cached
+        total["seconds"] += probe.seconds
+        total["max_seconds"] = max(total["max_seconds"], probe.seconds)
+        total["expanded"] += probe.expanded
+        total["edges"] += probe.edges
+        total["queue_max"] = max(total["queue_max"], probe.queue_max)
+        if self.trace is not None:
+            if self._file is None:
+                self._file = open(self.trace, "a")
+            self._file.write(json.dumps(probe.as_dict()) + "\n")
+
+    def summary(self):
+        """
+        Table of the totals, one row per query or phase.
+        :return: the table as a string.
+        """
+        header = (f"{'name':<20}{'count':>8}{'cached':>8}{'total s':>12}"
+                  f"{'mean ms':>10}{'max ms':>10}{'expanded':>12}"
+                  f"{'edges':>12}{'queue max':>11}")
+        lines = [header, "-" * len(header)]
+        for name, total in self.totals.items():
+            mean = total["seconds"] / total["count"]
+            lines.append(
+                f"{name:<20}{total['count']:>8}{total['cached']:>8}"
+                f"{total['seconds']:>12.6f}{1000 * mean:>10.3f}"
+                f"{1000 * total['max_seconds']:>10.3f}"
+                f"{total['expanded']:>12}{total['edges']:>12}"
+                f"{total['queue_max']:>11}")
+        return "\n".join(lines)
+
+    def close(self):
+        """Close the trace file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
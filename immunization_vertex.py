@@ -0,0 +1,41 @@
+import sys
+from itertools import count
+from weakref import WeakValueDictionary
+
+
+class Vertex:
+    """
+    Class to define a vertex in our graph.
+    Here, a vertex signifies a Vaccine or Strain.
+    Vertices are flyweights: Vertex(name, type) returns the
+    one live instance of that (type, name), so equality and
+    hashing are those of the object identity, done in C, and
+    looking a vertex up again creates no new Vertex. Instances
+    have no __dict__, an interned name and an integer id
+    unique in the process. They must not be modified.
+    """
+    __slots__ = ('name', 'type', 'id', '__weakref__')
+
+    # type -> name -> the live Vertex
+    _registry = dict()
+    _ids = count()
+
+    def __new__(cls, vtx_name: str, vtx_type: str):
+        registry = cls._registry.get(vtx_type)
+        if registry is None:
+            registry = cls._registry[vtx_type] = WeakValueDictionary()
+        vertex = registry.get(vtx_name)
+        if vertex is None:
+            vertex = super().__new__(cls)
+            vertex.name = sys.intern(vtx_name)
+            vertex.type = sys.intern(vtx_type)
+            vertex.id = next(cls._ids)
+            registry[vtx_name] = vertex
+        return vertex
+
+    def __reduce__(self):
+        # unpickled vertices are the canonical ones
+        return Vertex, (self.name, self.type)
+
+    def __str__(self):
+        return str(self.type + " : " + self.name)
@@ -1,79 +1,421 @@
-class Vertex:
-    """
-    Class to define a vertex in our graph.
-    Here, a vertex signifies a Vaccine or Strain.
-    """
-    def __init__(self, vtx_name: str, vtx_type: str):
-        """Initialise an empty vertex."""
-        self.name = vtx_name
-        self.type = vtx_type
+import argparse
+import heapq
+import multiprocessing as mp
+import os
+import time
+from collections import defaultdict
+from itertools import groupby, islice
+from operator import itemgetter
 
-    def __eq__(self, other):
-        if isinstance(other, Vertex):
-            return self.name == other.name and \
-                   self.type == other.type
-        return False
+import immunization_snapshot
+from immunization_blocks import BlockCutTree
+from immunization_cache import CACHE_SIZE, QueryCache
+from immunization_components import SPLIT_BUDGET, ComponentIndex
+from immunization_cover import (MAX_NODES, VaccineCover, exact_cover,
+                                greedy_cover, harmonic, packing_bound)
+from immunization_csr import CompactGraph
+from immunization_overlap import OverlapMatrix
+from immunization_parser import InputParser
+from immunization_projection import MAX_STRAIN_DEGREE, VaccineProjection
+from immunization_search import (bfs_tree, bidirectional_bfs, iter_bfs,
+                                 iter_dfs, multi_source_bfs,
+                                 multi_source_bfs_array, tree_path)
+from immunization_similarity import BANDS, NUM_PERM, MinHashIndex
+from immunization_sink import FileSink
+from immunization_snapshot import SnapshotError
+from immunization_stats import Instrumentation
+from immunization_vertex import Vertex
 
-    def __str__(self):
-        return str(self.type + " : " + self.name)
+BATCH_SIZE = 10000
+OUTPUT_FILE = "outputPS16.txt"
+# a full traversal costs about as much as this many
+# bidirectional searches on strain/vaccine graphs
+SHARED_BFS_MIN_TARGETS = 128
+# number of prompts per task of the parallel prompt runner
+PARALLEL_CHUNK_SIZE = 1024
 
 
 class Immunization:
     """
     Class to define the graph of vaccines and strains.
     Initialised using 2 components :
-    vaccine_list - Stores vaccines and strains
-                   as a list of Vertex.
-    edges - Stores the list of (vaccine, strain)
-            combinations representing the edges
-            of the graph.
+    vertices - Stores vaccines and strains as a dict
+               keyed by (type, name) pointing to the Vertex.
+    adjacency - Stores, for every Vertex, the insertion
+                ordered set (a dict with None values) of
+                the vertices it is connected to.
+    by_type - Lists the vertices of each type in insertion
+              order, so they are counted in O(1).
+    Once frozen (see freeze), both are replaced by
+    compact - CompactGraph holding the graph as integer
+              ids and CSR arrays. The graph is then
+              read-only.
+    components - ComponentIndex, union-find of the connected
+                 components kept up to date on every insert
+                 and removal, or rebuilt on its next use when
+                 a removal could not be checked within
+                 SPLIT_BUDGET vertices (see _component_index).
+    The outputs of the display and search functions are
+    written to sink, an OutputSink (a buffered FileSink on
+    outputPS16.txt by default). Call sink.flush() or
+    sink.close() to push them out.
+    Their results are kept in cache, a QueryCache bound to
+    version, the counter of changes made to the graph.
+    When stats is an Instrumentation, the queries and the
+    phases of readInputfile are measured into it.
+    projection - optional VaccineProjection answering
+                 commonStrain and findVaccineConnect, see
+                 enable_projection.
+    blocks - BlockCutTree of the graph, built on demand by the
+             resilience queries for the current version.
     """
 
-    def __init__(self):
-        """Initialise an empty graph."""
-        self.vaccine_list = list()
-        self.edges = list()
+    def __init__(self, sink=None, cache_size=CACHE_SIZE, stats=None):
+        """
+        Initialise an empty graph.
+        :param sink: OutputSink receiving the outputs.
+        :param cache_size: number of query results cached,
+                           0 to disable the cache.
+        :param stats: optional Instrumentation, None to measure
+                      nothing.
+        """
+        if sink is None:
+            sink = FileSink(OUTPUT_FILE)
+        self.sink = sink
+        self.cache = QueryCache(cache_size) if cache_size > 0 else None
+        self.version = 0
+        self.vertices = dict()
+        self.adjacency = dict()
+        self.by_type = {'strain': [], 'vaccine': []}
+        self.compact = None
+        self.components = ComponentIndex()
+        self._components_stale = False
+        self.overlap = None
+        self.projection = None
+        self.similarity = None
+        self._similarity_key = None
+        # counter of the changes made to the edges, the
+        # MinHashIndex only depends on them
+        self._edge_version = 0
+        self.blocks = None
+        self._blocks_version = None
+        self.source_file = None
+        self.parse_stats = None
+        self.stats = stats
 
     def __iter__(self):
-        return iter(self.vaccine_list)
+        if self.compact is not None:
+            return (self._vertex(x) for x in range(len(self.compact)))
+        return iter(self.vertices.values())
 
     def __contains__(self, vertex: Vertex):
-        return vertex in self.vaccine_list
+        return self.has_vertex(vertex)
+
+    @property
+    def vaccine_list(self):
+        """List of all the vertices in insertion order."""
+        return list(self)
+
+    @property
+    def edges(self):
+        """List of the (strain, vaccine) edges of the graph."""
+        return [(self._vertex(s), self._vertex(v))
+                for s in self._nodes('strain')
+                for v in self._neighbours(s)]
 
     def is_empty(self):
         """Check if graph is empty."""
-        return len(self.vaccine_list) == 0
+        if self.compact is not None:
+            return len(self.compact) == 0
+        return len(self.vertices) == 0
+
+    def freeze(self):
+        """
+        Switch the graph to its compact read-only form:
+        names are interned into a string table and the
+        edges are stored as two CSR structures
+        (strain -> vaccines and vaccine -> strains).
+        """
+        if self.compact is None:
+            self._set_compact(CompactGraph.from_graph(self))
+        return self
+
+    def _set_compact(self, compact, components=None):
+        """
+        Make a CompactGraph the storage of the graph.
+        :param compact: CompactGraph to use.
+        :param components: its ComponentIndex, built if None.
+        """
+        if components is None:
+            components = ComponentIndex.from_compact(compact)
+        if self.is_empty():
+            # loaded, not frozen: the edges are new
+            self._edge_version += 1
+        self.compact = compact
+        self.components = components
+        self._components_stale = False
+        self.vertices = dict()
+        self.adjacency = dict()
+        self.by_type = {'strain': [], 'vaccine': []}
+        self.overlap = None
+        if self.projection is not None:
+            # handles change, project the compact graph again
+            self.projection = VaccineProjection.from_graph(
+                self, self.projection.max_strain_degree)
+        self.version += 1
+
+    def save_snapshot(self, path):
+        """
+        Save the graph to a binary snapshot (string table and
+        CSR arrays, with a checksum) that load_snapshot maps
+        back in milliseconds. The identity of the input file
+        is recorded so the snapshot can be detected as stale.
+        :param path: path of the snapshot file.
+        """
+        compact = self.compact
+        components = self._component_index()
+        if compact is None:
+            compact = CompactGraph.from_graph(self)
+            components = ComponentIndex.from_compact(compact)
+        immunization_snapshot.save_snapshot(compact, components, path,
+                                            self.source_file)
+
+    @classmethod
+    def load_snapshot(cls, path, source=None, verify_hash=True, **kwargs):
+        """
+        Load a frozen graph from a snapshot saved by save_snapshot.
+        The CSR arrays are used straight from the mapped file.
+        :param path: path of the snapshot file.
+        :param source: path of the input file; if given, a
+                       snapshot older than its current content
+                       raises SnapshotError.
+        :param verify_hash: compare the sha256 of source to the
+                            one recorded, not only its mtime and
+                            size (which an edit can leave as
+                            they were).
+        :param kwargs: arguments of Immunization().
+        :return: the frozen Immunization.
+        """
+        if source is not None and \
+                not immunization_snapshot.is_current(path, source,
+                                                     verify_hash):
+            raise SnapshotError("Snapshot " + path + " is older than " +
+                                source + ".")
+        graph = cls(**kwargs)
+        graph._set_compact(*immunization_snapshot.load_snapshot(path))
+        graph.source_file = source
+        return graph
+
+    def _nodes(self, vtx_type):
+        """
+        Internal handles of all the vertices of a type,
+        in insertion order. A handle is the Vertex itself,
+        or its integer id once the graph is frozen.
+        :param vtx_type: 'strain' or 'vaccine'.
+        """
+        if self.compact is not None:
+            if vtx_type == 'strain':
+                return range(self.compact.n_strains)
+            return range(self.compact.n_strains, len(self.compact))
+        return self.by_type[vtx_type]
+
+    def count(self, vtx_type):
+        """
+        Number of vertices of a type, in O(1).
+        :param vtx_type: 'strain' or 'vaccine'.
+        """
+        return len(self._nodes(vtx_type))
+
+    def _node(self, name, vtx_type):
+        """
+        Internal handle of a vertex, None if absent.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        """
+        if self.compact is not None:
+            return self.compact.node(name, vtx_type)
+        return self.vertices.get((vtx_type, name))
+
+    def _neighbours(self, node):
+        """
+        Handles of the vertices connected to a vertex.
+        :param node: handle of the vertex.
+        """
+        if self.compact is not None:
+            return self.compact.neighbours(node)
+        return self.adjacency[node]
+
+    def _name(self, node):
+        """
+        Name of a vertex.
+        :param node: handle of the vertex.
+        """
+        if self.compact is not None:
+            return self.compact.names[node]
+        return node.name
+
+    def _vertex(self, node):
+        """
+        Vertex of a handle.
+        :param node: handle of the vertex.
+        """
+        if self.compact is not None:
+            return Vertex(self.compact.names[node],
+                          self.compact.node_type(node))
+        return node
+
+    def _cache_get(self, key):
+        """
+        Cached result of a query, None on a miss.
+        :param key: hashable key of the query.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get(key, self.version)
+
+    def _cache_put(self, key, result):
+        """
+        Cache the result of a query.
+        :param key: hashable key of the query.
+        :param result: result of the query.
+        :return: result.
+        """
+        if self.cache is None:
+            return result
+        return self.cache.put(key, self.version, result)
+
+    def _component_index(self):
+        """
+        ComponentIndex of the graph, rebuilt first if a removal
+        left it stale.
+        """
+        if self._components_stale:
+            self.components = ComponentIndex.from_graph(
+                self.vertices.values(), self._neighbours)
+            self._components_stale = False
+        return self.components
+
+    def _check_mutable(self):
+        """Refuse modifications of a frozen graph."""
+        if self.compact is not None:
+            raise RuntimeError("Graph is frozen, vertices and edges "
+                               "cannot be added.")
 
-    def readInputfile(self, input_file):
+    def readInputfile(self, input_file, batch_size=BATCH_SIZE,
+                      frozen=False, snapshot=None, verify_hash=True):
         """
         This function reads the input file inputPS16.txt
         containing the name of the strains and associated
         vaccines in one line.
+        The file is memory-mapped and parsed lazily by
+        InputParser, and the edges are inserted in batches
+        of batch_size, so memory usage does not grow with
+        the size of the file. The parser is kept in
+        self.parse_stats to report the parse throughput.
         :param input_file: path of input file.
+        :param batch_size: number of edges per bulk insert.
+        :param frozen: build the compact read-only graph.
+                       On an empty graph it is built straight
+                       from the parsed ids, without any Vertex.
+        :param snapshot: path of a snapshot of the frozen graph.
+                         On an empty graph it is loaded instead of
+                         parsing input_file when it is current,
+                         and (re)written otherwise.
+        :param verify_hash: a snapshot is current when the mtime,
+                            size and sha256 of input_file are
+                            those recorded in it, False to skip
+                            hashing the file and trust its mtime
+                            and size.
         """
-        with open(input_file, 'r') as fi:
-            input_file_read = fi.read()
-        input_split = input_file_read.split("\n")
-
-        # loop across the lines of the file
-        for i in input_split:
-            each_split = i.replace("/", " ").split()
-            s = Vertex(each_split[0], 'strain')
-            self.add_vertex(s)
-            if len(i) > 2:
-                for j in range(1, len(each_split)):
-                    v = Vertex(each_split[j], 'vaccine')
-                    self.add_vertex(v)
-                    self.add_edge(s, v)
+        started = time.perf_counter()
+        if snapshot is not None and self.is_empty():
+            if immunization_snapshot.is_current(snapshot, input_file,
+                                                verify_hash):
+                try:
+                    self._set_compact(
+                        *immunization_snapshot.load_snapshot(snapshot))
+                    self.source_file = input_file
+                    if self.stats is not None:
+                        self.stats.probe('load_snapshot', snapshot).done(
+                            time.perf_counter() - started)
+                    return self
+                except (OSError, SnapshotError):
+                    pass
+            self.readInputfile(input_file, batch_size, frozen=True)
+            self.save_snapshot(snapshot)
+            return self
+
+        self.source_file = input_file
+        parser = InputParser(input_file)
+        if frozen and self.is_empty():
+            self._set_compact(CompactGraph.from_parser(parser))
+            parser.release()
+            self.parse_stats = parser
+            self._record_load(parser, started)
+            return self
+
+        # one Vertex per interned name id
+        strains = []
+        vaccines = []
+        batch = []
+        for strain_id, vaccine_ids in parser:
+            if strain_id == len(strains):
+                strains.append(Vertex(parser.strain_names[strain_id],
+                                      'strain'))
+            s = strains[strain_id]
+            if not vaccine_ids:
+                # flush first so vertices keep the file order
+                self.add_edges(batch)
+                batch = []
+                self.add_vertex(s)
+                continue
+            for vaccine_id in vaccine_ids:
+                if vaccine_id == len(vaccines):
+                    vaccines.append(
+                        Vertex(parser.vaccine_names[vaccine_id], 'vaccine'))
+                batch.append((s, vaccines[vaccine_id]))
+            if len(batch) >= batch_size:
+                self.add_edges(batch)
+                batch = []
+        self.add_edges(batch)
+        parser.release()
+        self.parse_stats = parser
+        if frozen:
+            self.freeze()
+        self._record_load(parser, started)
 
         return self
 
+    def _record_load(self, parser, started):
+        """
+        Record the parse and insert times of readInputfile.
+        :param parser: InputParser of the file read.
+        :param started: perf_counter value at the start.
+        """
+        if self.stats is None:
+            return
+        self.stats.probe('parse', parser.input_file).done(parser.elapsed)
+        self.stats.probe('insert', parser.input_file).done(
+            time.perf_counter() - started - parser.elapsed)
+
     def has_vertex(self, node):
         """
         Check if vertex is present in the graph.
         :param node: Vertex to be checked.
         """
-        return node in self.vaccine_list
+        return self._node(node.name, node.type) is not None
+
+    def get_vertex(self, name, vtx_type):
+        """
+        Fetch the Vertex stored in the graph.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :return: the stored Vertex, None if absent.
+        """
+        node = self._node(name, vtx_type)
+        if node is None:
+            return None
+        return self._vertex(node)
 
     def has_edge(self, s, v):
         """
@@ -81,19 +423,32 @@ class Immunization:
         :param s: Strain-Vertex name.
         :param v: Vaccine-Vertex name.
         """
+        strain = self._node(s, 'strain')
+        vaccine = self._node(v, 'vaccine')
         return (
-                self.has_vertex(Vertex(s, 'strain')) and
-                self.has_vertex(Vertex(v, 'vaccine')) and
-                (Vertex(s, 'strain'), Vertex(v, 'vaccine')) in self.edges
+                strain is not None and
+                vaccine is not None and
+                vaccine in self._neighbours(strain)
         )
 
     def add_vertex(self, node):
         """
         Add Vertex into the graph.
         :param node: Vertex to be added.
+        :return: the Vertex stored in the graph.
         """
-        if not self.has_vertex(node):
-            self.vaccine_list.append(node)
+        self._check_mutable()
+        key = (node.type, node.name)
+        stored = self.vertices.get(key)
+        if stored is None:
+            self.vertices[key] = stored = node
+            self.adjacency[node] = dict()
+            self.by_type[node.type].append(node)
+            self.components.add(node)
+            if self.overlap is not None and node.type == 'vaccine':
+                self.overlap.add_vaccine(node.name)
+            self.version += 1
+        return stored
 
     def add_edge(self, str_vertex, vacc_vertex):
         """
@@ -101,44 +456,162 @@ class Immunization:
         :param str_vertex: Strain-Vertex.
         :param vacc_vertex: Vaccine-Vertex.
         """
-        if not self.has_vertex(str_vertex):
-            self.add_vertex(str_vertex)
-        if not self.has_vertex(vacc_vertex):
-            self.add_vertex(vacc_vertex)
+        self.add_edges(((str_vertex, vacc_vertex),))
+
+    def add_edges(self, edges):
+        """
+        Add edges into the graph in bulk.
+        Every distinct vertex of the batch is looked up
+        (and added if needed) only once.
+        :param edges: iterable of (Strain-Vertex, Vaccine-Vertex).
+        :return: number of edges actually added.
+        """
+        self._check_mutable()
+        count = 0
+        resolved = dict()
+        adjacency = self.adjacency
+        union = self.components.union
+        for str_vertex, vacc_vertex in edges:
+            s = resolved.get(str_vertex)
+            if s is None:
+                s = resolved[str_vertex] = self.add_vertex(str_vertex)
+            v = resolved.get(vacc_vertex)
+            if v is None:
+                v = resolved[vacc_vertex] = self.add_vertex(vacc_vertex)
+            if v not in adjacency[s]:
+                if self.overlap is not None:
+                    self.overlap.update(
+                        v.name, [x.name for x in adjacency[s]], 1)
+                if self.projection is not None:
+                    self.projection.add_edge(s, v, adjacency[s])
+                adjacency[s][v] = None
+                adjacency[v][s] = None
+                union(s, v)
+                self.version += 1
+                self._edge_version += 1
+                count += 1
+        return count
+
+    def remove_edge(self, str_vertex, vacc_vertex):
+        """
+        Remove edge from the graph.
+        :param str_vertex: Strain-Vertex.
+        :param vacc_vertex: Vaccine-Vertex.
+        """
+        self.remove_edges(((str_vertex, vacc_vertex),))
+
+    def remove_edges(self, edges):
+        """
+        Remove edges from the graph in bulk. Absent edges are
+        ignored and the vertices stay in the graph. Each removal
+        checks if its component split with a search of at most
+        SPLIT_BUDGET vertices (the smaller side when it did);
+        past that the component index is marked stale and
+        rebuilt, in O(V + E), by the next query needing it.
+        :param edges: iterable of (Strain-Vertex, Vaccine-Vertex).
+        :return: number of edges actually removed.
+        """
+        self._check_mutable()
+        count = 0
+        vertices = self.vertices
+        adjacency = self.adjacency
+        for str_vertex, vacc_vertex in edges:
+            s = vertices.get(('strain', str_vertex.name))
+            v = vertices.get(('vaccine', vacc_vertex.name))
+            if s is None or v is None or v not in adjacency[s]:
+                continue
+            del adjacency[s][v]
+            del adjacency[v][s]
+            if self.overlap is not None:
+                self.overlap.update(
+                    v.name, [x.name for x in adjacency[s]], -1)
+            if self.projection is not None:
+                self.projection.remove_edge(s, v, adjacency[s])
+            if not self._components_stale and self.components.split(
+                    s, v, adjacency.__getitem__, SPLIT_BUDGET) is None:
+                self._components_stale = True
+            self.version += 1
+            self._edge_version += 1
+            count += 1
+        return count
 
-        self.add_vertex(str_vertex)
-        self.add_vertex(vacc_vertex)
-        self.edges.append((str_vertex, vacc_vertex))
+    def apply_delta(self, delta):
+        """
+        Apply a batch of changes to the graph: adjacency,
+        component index and overlap matrix are updated in
+        place and cached results are invalidated. Additions
+        cost O(1) each; a removal costs at most a search of
+        SPLIT_BUDGET vertices, so a batch runs in time
+        proportional to its size, but a removal that search
+        cannot settle leaves the component index to be rebuilt
+        in O(V + E) on its next use (see remove_edges).
+        A delta file holds one record per line, in the
+        format of the input file:
+            + Strain / Vaccine-1 / Vaccine-2 ...   (add)
+            - Strain / Vaccine-1 / Vaccine-2 ...   (remove)
+        a line without a sign being an addition.
+        :param delta: path of a delta file, or iterable of
+                      (op, strain name, vaccine name) records
+                      where op is '+' or '-'. Nothing is applied
+                      if any op is unknown.
+        :return: (number of edges added, number removed).
+        """
+        self._check_mutable()
+        if isinstance(delta, (str, os.PathLike)):
+            delta = read_delta(delta)
+        # check the whole batch first, so that a bad record
+        # leaves the graph untouched
+        delta = list(delta)
+        for op, _, _ in delta:
+            if op not in ('+', '-'):
+                raise ValueError("Unknown delta operation " + repr(op) +
+                                 ", expected '+' or '-'.")
+        added = removed = 0
+        for op, records in groupby(delta, key=itemgetter(0)):
+            edges = [(Vertex(strain, 'strain'), Vertex(vaccine, 'vaccine'))
+                     for _, strain, vaccine in records]
+            if op == '+':
+                added += self.add_edges(edges)
+            else:
+                removed += self.remove_edges(edges)
+        return added, removed
 
-    def displayAll(self):
+    def displayAll(self, counts_only=False, offset=0, limit=None):
         """
         This function displays the total number (count)
         of unique vaccines and strains entered through
         the input file.
         It should also list out the unique vaccines and
         strains.The output of this function should be
-        pushed into outputPS16.txt file.
+        pushed into the output sink (outputPS16.txt file).
         The output format should be as mentioned below.
+        The names are streamed to the sink one by one, the
+        output is never built as a whole.
+        :param counts_only: only display the totals.
+        :param offset: number of strains and of vaccines
+                       skipped at the start of each list.
+        :param limit: maximum number of strains and of vaccines
+                      listed, None for all of them.
+        """
+        self.sink.writelines(self._display_all(counts_only, offset, limit))
+
+    def _display_all(self, counts_only=False, offset=0, limit=None):
+        """
+        Output of displayAll, piece by piece.
+        :return: generator of strings.
         """
-        strn_list = [x for x in self.vaccine_list if x.type == "strain"]
-        vacc_list = [x for x in self.vaccine_list if x.type == "vaccine"]
-        func_intro = "\n--------Function displayAll--------"
-        num_strains = "\nTotal no. of strains: " + \
-                      str(len(strn_list))
-        num_vaccines = "\nTotal no. of vaccines: " + \
-                       str(len(vacc_list))
-        list_strains = "\nList of strains:"
-        for s in strn_list:
-            list_strains += ("\n" + s.name)
-        list_vaccines = "\n\nList of vaccines:"
-        for v in vacc_list:
-            list_vaccines += ("\n" + v.name)
-        func_end = "\n" + "-" * 16 + "\n"
-
-        with open("outputPS16.txt", "a") as fout:
-            fout.write(func_intro + num_strains + num_vaccines +
-                       list_strains + list_vaccines + func_end)
-            fout.close()
+        yield "\n--------Function displayAll--------"
+        yield "\nTotal no. of strains: " + str(self.count('strain'))
+        yield "\nTotal no. of vaccines: " + str(self.count('vaccine'))
+        if not counts_only:
+            end = None if limit is None else offset + limit
+            yield "\nList of strains:"
+            for x in islice(self._nodes('strain'), offset, end):
+                yield "\n" + self._name(x)
+            yield "\n\nList of vaccines:"
+            for x in islice(self._nodes('vaccine'), offset, end):
+                yield "\n" + self._name(x)
+        yield "\n" + "-" * 16 + "\n"
 
     def displayStrains(self, vacc):
         """
@@ -146,11 +619,22 @@ class Immunization:
         vaccine is associated with.
         :param vacc: Vaccine-name.
         """
-        vaccine = Vertex(vacc, 'vaccine')
+        self._write(self._display_strains(vacc))
+
+    def _display_strains(self, vacc):
+        """
+        Output of displayStrains.
+        :param vacc: Vaccine-name.
+        """
+        key = ('displayStrains', vacc)
+        output = self._cache_get(key)
+        if output is not None:
+            return output
+        vaccine = self._node(vacc, 'vaccine')
         output_intro_str = """\n--------Function displayStrain --------\n"""
-        if vaccine in self.vaccine_list:
-            list_strains = [conn[0].name for conn in self.edges
-                            if (conn[1] == vaccine)]
+        if vaccine is not None:
+            list_strains = [self._name(conn)
+                            for conn in self._neighbours(vaccine)]
             vaccine_info = "Vaccine name: " + vacc + "\n" + \
                            "List of Strains:\n"
             if len(list_strains) > 0:
@@ -162,9 +646,7 @@ class Immunization:
         else:
             output_info = "***Information about '" + vacc + "' is not available.***"
 
-        with open("outputPS16.txt", "a") as fout:
-            fout.write(output_intro_str + output_info)
-            fout.close()
+        return self._cache_put(key, output_intro_str + output_info)
 
     def displayVaccine(self, strn):
         """
@@ -172,11 +654,22 @@ class Immunization:
         associated with a strain.
         :param strn: Strain-name.
         """
-        strain = Vertex(strn, 'strain')
+        self._write(self._display_vaccine(strn))
+
+    def _display_vaccine(self, strn):
+        """
+        Output of displayVaccine.
+        :param strn: Strain-name.
+        """
+        key = ('displayVaccine', strn)
+        output = self._cache_get(key)
+        if output is not None:
+            return output
+        strain = self._node(strn, 'strain')
         output_intro_str = """\n--------Function displayVaccine --------\n"""
-        if strain in self.vaccine_list:
-            list_vaccines = [conn[1].name for conn in self.edges
-                             if (conn[0] == strain)]
+        if strain is not None:
+            list_vaccines = [self._name(conn)
+                             for conn in self._neighbours(strain)]
             strain_info = "Strain name: " + strn + "\n" + \
                           "List of Vaccines:\n"
             if len(list_vaccines) > 0:
@@ -188,28 +681,41 @@ class Immunization:
         else:
             output_info = "***Information about '" + strn + "' is not available.***"
 
-        with open("outputPS16.txt", "a") as fout:
-            fout.write(output_intro_str + output_info)
-            fout.close()
+        return self._cache_put(key, output_intro_str + output_info)
 
     def list_connections(self, v):
         """
         List all the edges of the Vertex V.
         :param v: Vertex - can be a vaccine or strain
         """
-        if v.type == 'vaccine':
-            list_conn = [x[0] for x in self.edges if x[1] == v]
-        else:
-            list_conn = [x[1] for x in self.edges if x[0] == v]
-        return list_conn
+        node = self._node(v.name, v.type)
+        if node is None:
+            return []
+        return [self._vertex(x) for x in self._neighbours(node)]
 
-    def commonStrain(self, vacA, vacB):
+    def commonStrain(self, vacA, vacB, limit=None):
         """
         This function finds out if two vaccine are related
-        to each other through one common strain using the
-        Breadth-first traversal technique.
+        to each other through one common strain, by
+        intersecting the strains of both vaccines starting
+        from the vaccine with fewer strains.
+        :param vacA: Vaccine-A name
+        :param vacB: Vaccine-B name
+        :param limit: maximum number of common strains to
+                      report, all of them if None.
+        :return: list of the common strain names reported.
+        """
+        output, common = self._common_strain(vacA, vacB, limit)
+        self._write(output)
+        return common
+
+    def _common_strain(self, vacA, vacB, limit=None):
+        """
+        Output of commonStrain.
         :param vacA: Vaccine-A name
         :param vacB: Vaccine-B name
+        :param limit: maximum number of common strains.
+        :return: (output, list of common strain names).
         """
         output_intro = f"""\n--------Function commonStrain --------
 Vaccine A: {vacA}
@@ -217,136 +723,774 @@ Vaccine B: {vacB}
 Common Strain: """
         output_string = f"***'{vacA}' and '{vacB}' are not related " + \
                         f"to each other through one common strain.***"
-        start = Vertex(vacA, 'vaccine')
-        end = Vertex(vacB, 'vaccine')
+        probe = None
+        if self.stats is not None:
+            probe = self.stats.probe('commonStrain', vacA, vacB)
+        start = self._node(vacA, 'vaccine')
+        end = self._node(vacB, 'vaccine')
+        common = []
 
-        if not self.has_vertex(start):
+        if start is None:
             output_string = f"***Information about '{vacA}' " + \
                             "is not available.***"
-        elif not self.has_vertex(end):
+        elif end is None:
             output_string = f"***Information about '{vacB}' " + \
                             "is not available.***"
+        elif start == end:
+            output_string = f"Inputs '{vacA}' and '{vacB}' " + \
+                            "refer to the same vaccine."
+        elif self._component_index().connected(start, end):
+            # the common strains do not depend on the argument order
+            key = ('commonStrain', min(vacA, vacB), max(vacA, vacB), limit)
+            common = self._cache_get(key)
+            if common is None:
+                common = self._cache_put(
+                    key, self._common_strains(start, end, limit, probe))
+            elif probe is not None:
+                probe.cached = True
+            common = list(common)
+            if common:
+                output_string = "Yes, " + ", ".join(common) + "."
+
+        if probe is not None:
+            probe.done()
+        return output_intro + output_string, common
+
+    def _common_strains(self, start, end, limit=None, probe=None):
+        """
+        Names of the strains shared by two vaccines.
+        :param start: handle of the first vaccine.
+        :param end: handle of the second vaccine.
+        :param limit: maximum number of common strains.
+        :param probe: optional Probe counting the work done.
+        :return: tuple of names.
+        """
+        if self.projection is not None:
+            # one order for both argument orders
+            if self._name(start) > self._name(end):
+                start, end = end, start
+            common = self.projection.common(start, end)
+            return tuple(self._name(x) for x in common[:limit])
+        shared = limit
+        if self.overlap is not None:
+            shared = self.overlap.shared(self._name(start),
+                                         self._name(end))
+            if limit is not None:
+                shared = min(shared, limit)
+        neighbours = self._neighbours
+        if probe is not None:
+            neighbours = probe.neighbours(neighbours)
+        return tuple(self._name(x) for x in islice(
+            self._common_neighbours(start, end, neighbours), shared))
+
+    def iter_bfs(self, name, vtx_type='vaccine', max_depth=None):
+        """
+        Lazy breadth-first traversal from a vertex. Nothing is
+        written and the traversal stops with the iteration, so
+        e.g. the first 10 vaccines reached from a vaccine are
+            islice((v for v, _ in graph.iter_bfs(vacc)
+                    if v.type == 'vaccine'), 10)
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :param max_depth: maximum depth in edges, None for no limit.
+        :return: generator of (Vertex, depth), empty if the
+                 vertex is absent.
+        """
+        return self._traverse(iter_bfs, name, vtx_type, max_depth)
+
+    def iter_dfs(self, name, vtx_type='vaccine', max_depth=None):
+        """
+        Lazy depth-first traversal from a vertex, in preorder.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :param max_depth: maximum depth in edges, None for no limit.
+        :return: generator of (Vertex, depth), empty if the
+                 vertex is absent.
+        """
+        return self._traverse(iter_dfs, name, vtx_type, max_depth)
+
+    def _traverse(self, traversal, name, vtx_type, max_depth):
+        """Run iter_bfs or iter_dfs from a vertex, see iter_bfs."""
+        start = self._node(name, vtx_type)
+        if start is None:
+            return
+        for node, depth in traversal(start, self._neighbours, max_depth):
+            yield self._vertex(node), depth
+
+    def reachable_from(self, vaccines, max_hops=4):
+        """
+        Vaccines reachable from a panel of vaccines, found with
+        one multi-source Breadth-first traversal instead of a
+        search per pair. On a frozen graph the traversal runs
+        over flat int arrays.
+        :param vaccines: iterable of Vaccine names, unknown
+                         names are ignored.
+        :param max_hops: maximum length of the chains in edges
+                         (2 per strain crossed), None for no
+                         limit.
+        :return: dict vaccine name -> (distance in edges, name of
+                 the nearest vaccine of the panel), closest
+                 first, the panel itself at distance 0.
+        """
+        sources = [self._node(name, 'vaccine') for name in vaccines]
+        sources = [x for x in sources if x is not None]
+        if self.compact is not None:
+            names = self.compact.names
+            n_strains = self.compact.n_strains
+            distance, origin, reached = multi_source_bfs_array(
+                sources, self.compact.neighbours, len(self.compact),
+                max_hops)
+            return {names[x]: (distance[x], names[origin[x]])
+                    for x in reached if x >= n_strains}
+        reached = multi_source_bfs(sources, self._neighbours, max_hops)
+        return {x.name: (depth, source.name)
+                for x, (depth, source) in reached.items()
+                if x.type == 'vaccine'}
+
+    def minimal_vaccine_cover(self, strains=None, exact=False,
+                              max_nodes=MAX_NODES):
+        """
+        Smallest set of vaccines found that is effective on all
+        the strains, or on some of them. The greedy cover (lazy,
+        with a priority queue of the gains) takes the vaccine
+        covering the most uncovered strains until none is left;
+        its size is then bounded from below by a packing of
+        strains sharing no vaccine, which certifies its ratio.
+        With exact, a branch and bound search started from it
+        looks for a smaller one. It only runs on small instances
+        (at most EXACT_MAX_ELEMENTS strains and a greedy cover
+        of at most EXACT_MAX_SIZE vaccines) and stops after
+        max_nodes nodes; the cover is then not proven optimal.
+        :param strains: iterable of Strain names, None for all.
+        :param exact: also run the branch and bound search.
+        :param max_nodes: limit of the nodes explored by it.
+        :return: VaccineCover.
+        """
+        started = time.perf_counter()
+        if strains is None:
+            nodes = [x for x in self._nodes('strain') if self._neighbours(x)]
+            uncovered = [self._name(x) for x in self._nodes('strain')
+                         if not self._neighbours(x)]
+        else:
+            nodes, uncovered = [], []
+            for name in dict.fromkeys(strains):
+                node = self._node(name, 'strain')
+                if node is None or not self._neighbours(node):
+                    uncovered.append(name)
+                else:
+                    nodes.append(node)
+        vaccines = dict.fromkeys(v for x in nodes for v in self._neighbours(x))
+        candidates = [(v, self._neighbours(v)) for v in vaccines]
+        cover = greedy_cover(nodes, candidates)
+        guarantee = harmonic(max((len(x) for _, x in candidates), default=0))
+        lower_bound = packing_bound(nodes, self._neighbours)
+        if len(candidates):
+            largest = max(len(x) for _, x in candidates)
+            lower_bound = max(lower_bound, -(-len(nodes) // largest))
+        optimal = len(cover) == lower_bound
+        if exact and not optimal:
+            cover, optimal = exact_cover(nodes, candidates, cover, max_nodes)
+            if optimal:
+                lower_bound = len(cover)
+        return VaccineCover([self._name(x) for x in cover], uncovered,
+                            lower_bound, guarantee, optimal,
+                            time.perf_counter() - started)
+
+    def _block_cut_tree(self):
+        """BlockCutTree of the graph, built again after changes."""
+        if self._blocks_version != self.version:
+            self.blocks = BlockCutTree.from_graph(
+                (x for t in ('strain', 'vaccine') for x in self._nodes(t)),
+                self._neighbours)
+            self._blocks_version = self.version
+        return self.blocks
+
+    def articulation_points(self, vtx_type=None):
+        """
+        Single points of connection: the vertices whose removal
+        disconnects their connected component. Found with one
+        iterative Tarjan pass, in linear time.
+        :param vtx_type: 'strain' or 'vaccine', None for both.
+        :return: list of Vertex.
+        """
+        cuts = [self._vertex(x) for x in self._block_cut_tree().cuts]
+        return [x for x in cuts if vtx_type is None or x.type == vtx_type]
+
+    def bridges(self):
+        """
+        Edges whose removal disconnects their connected
+        component.
+        :return: list of (strain name, vaccine name).
+        """
+        pairs = []
+        for a, b in self._block_cut_tree().bridges:
+            a, b = self._vertex(a), self._vertex(b)
+            if a.type != 'strain':
+                a, b = b, a
+            pairs.append((a.name, b.name))
+        return pairs
+
+    def what_if_remove(self, name, vtx_type='vaccine'):
+        """
+        Groups of vaccines that would stop being related
+        (connected by a chain, whatever its length) if a vertex
+        were withdrawn. Read from the block-cut tree, without
+        searching the graph again for every vertex asked about.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :return: list of lists of Vaccine names, one list per
+                 piece left with vaccines, largest first. A
+                 single list means nothing is split apart.
+        """
+        node = self._node(name, vtx_type)
+        if node is None:
+            return []
+        groups = []
+        for piece in self._block_cut_tree().pieces(node):
+            vaccines = [self._vertex(x) for x in piece]
+            vaccines = [x.name for x in vaccines if x.type == 'vaccine']
+            if vaccines:
+                groups.append(vaccines)
+        return sorted(groups, key=len, reverse=True)
+
+    def component_sizes(self):
+        """
+        Sizes of the connected components of the graph.
+        :return: list of (number of strains, number of
+                 vaccines), largest components first.
+        """
+        sizes = []
+        for members in self._component_index().groups().values():
+            n_strains = sum(1 for x in members
+                            if self._vertex(x).type == 'strain')
+            sizes.append((n_strains, len(members) - n_strains))
+        return sorted(sizes, key=sum, reverse=True)
+
+    def component_members(self, name, vtx_type='vaccine'):
+        """
+        Vertices of the connected component of a vertex.
+        :param name: Vertex name.
+        :param vtx_type: 'strain' or 'vaccine'.
+        :return: list of Vertex, empty if the vertex is absent.
+        """
+        node = self._node(name, vtx_type)
+        if node is None:
+            return []
+        return [self._vertex(x)
+                for x in self._component_index().members(node)]
+
+    def vaccine_overlap_matrix(self):
+        """
+        Number of strains shared by every pair of vaccines,
+        computed in one vectorized sparse product A.A^T of the
+        vaccine x strain incidence matrix (with SciPy, a pure
+        Python pass over the strains otherwise). The matrix is
+        then updated with every edge added or removed and lets
+        commonStrain rule out unrelated vaccines in O(1).
+        :return: OverlapMatrix, see to_csv to export it.
+        """
+        if self.overlap is None:
+            compact = self.compact
+            if compact is None:
+                compact = CompactGraph.from_graph(self)
+            self.overlap = OverlapMatrix.from_compact(compact)
+        return self.overlap
+
+    def enable_projection(self, max_strain_degree=MAX_STRAIN_DEGREE):
+        """
+        Build the vaccine projection of the graph, then kept up
+        to date with every edge added or removed. commonStrain
+        and findVaccineConnect become lookups in it instead of
+        searches of the strain/vaccine graph; the common strains
+        are then listed in the order they became shared.
+        :param max_strain_degree: memory budget, strains linked
+                                  to more vaccines are not
+                                  expanded into vaccine pairs.
+        :return: the VaccineProjection.
+        """
+        self.projection = VaccineProjection.from_graph(
+            self, max_strain_degree)
+        self.version += 1
+        return self.projection
+
+    def disable_projection(self):
+        """Drop the vaccine projection."""
+        if self.projection is not None:
+            self.projection = None
+            self.version += 1
+
+    def similar_vaccines(self, name, k=10, exact=True, num_perm=NUM_PERM,
+                         bands=BANDS, scan=False):
+        """
+        The k vaccines whose strains are the most similar to
+        those of a vaccine (Jaccard index). Candidates come from
+        the LSH buckets of a MinHashIndex, built on the first
+        call and again only after edges are added or removed,
+        and are then ranked on their exact Jaccard index. More
+        bands find more candidates (slower, fewer misses), more
+        num_perm makes the buckets more selective. The default
+        bands of a single value catch pairs of similarity
+        around 0.05 and up, as found between the vaccines of
+        the generated graphs; fewer than k vaccines can come
+        back when fewer candidates are found.
+        :param name: Vaccine name.
+        :param k: number of vaccines returned.
+        :param exact: re-rank on the exact Jaccard index, rank on
+                      the MinHash estimate otherwise.
+        :param num_perm: number of hash functions of the index.
+        :param bands: number of LSH bands of the index.
+        :param scan: when the buckets give fewer than k
+                     candidates, score all the vaccines sharing a
+                     strain with it instead, the only ones of non
+                     zero similarity. Its cost grows with the
+                     degree of the strains, unbounded on hubs.
+        :return: list of (vaccine name, similarity), most similar
+                 first, empty if the vaccine is absent.
+        """
+        node = self._node(name, 'vaccine')
+        if node is None:
+            return []
+        key = (self._edge_version, num_perm, bands)
+        if self._similarity_key != key:
+            # keyed by name, so that it outlives freeze
+            self.similarity = MinHashIndex(num_perm, bands)
+            for vaccine in self._nodes('vaccine'):
+                self.similarity.add(self._name(vaccine), [
+                    self._name(x) for x in self._neighbours(vaccine)])
+            self._similarity_key = key
+        if name not in self.similarity.signatures:
+            # added since, without any strain
+            return []
+        candidates = [self._node(x, 'vaccine')
+                      for x in self.similarity.candidates(name)]
+        if scan and len(candidates) < k:
+            candidates = dict.fromkeys(
+                x for strain in self._neighbours(node)
+                for x in self._neighbours(strain))
+            candidates.pop(node, None)
+        if exact:
+            strains = set(self._neighbours(node))
+            scored = []
+            for vaccine in candidates:
+                others = self._neighbours(vaccine)
+                shared = sum(1 for x in others if x in strains)
+                scored.append((shared / (len(strains) + len(others) - shared),
+                               vaccine))
         else:
-            visited = []
-            to_visit = [[start]]
-            if start == end:
-                output_string = f"Inputs '{vacA}' and '{vacB}' " + \
-                                "refer to the same vaccine."
-                with open("outputPS16.txt", "a") as fout:
-                    fout.write(output_intro + output_string)
-                    fout.close()
-                return
-            while to_visit:
-                path = to_visit.pop(0)
-                node = path[-1]
-                if node not in visited:
-                    neighbours = self.list_connections(node)
-                    for neighbour in neighbours:
-                        new_path = list(path)
-                        new_path.append(neighbour)
-                        to_visit.append(new_path)
-                        if neighbour == end and len(new_path) == 3:
-                            output_string = "Yes, " + new_path[1].name + "."
-                            with open("outputPS16.txt", "a") as fout:
-                                fout.write(output_intro + output_string)
-                                fout.close()
-                            return
-                    visited.append(node)
-        with open("outputPS16.txt", "a") as fout:
-            fout.write(output_intro + output_string)
-            fout.close()
-        return
-
-    def findVaccineConnect(self, vacA, vacB):
+            estimate = self.similarity.estimate
+            scored = [(estimate(name, self._name(x)), x) for x in candidates]
+        best = heapq.nsmallest(k, ((-score, self._name(x))
+                                   for score, x in scored))
+        return [(vacc, -score) for score, vacc in best]
+
+    def _common_neighbours(self, node_a, node_b, neighbours=None):
+        """
+        Lazily intersect the neighbours of two vertices,
+        scanning the smaller side against the larger one (the
+        first by name on a tie, so the order of the result
+        does not depend on the order of the arguments).
+        :param node_a: handle of the first vertex.
+        :param node_b: handle of the second vertex.
+        :param neighbours: neighbours function, _neighbours
+                           by default.
+        """
+        if neighbours is None:
+            neighbours = self._neighbours
+        small = neighbours(node_a)
+        large = neighbours(node_b)
+        if (len(small), self._name(node_a)) > \
+                (len(large), self._name(node_b)):
+            small, large = large, small
+            node_a, node_b = node_b, node_a
+        if self.compact is not None:
+            # CSR rows are plain arrays, bisect the sorted copy of
+            # the larger one instead of hashing it
+            has_neighbour = self.compact.has_neighbour
+            return (x for x in small if has_neighbour(node_b, x))
+        return (x for x in small if x in large)
+
+    def findVaccineConnect(self, vacA, vacB, max_hops=4):
         """
         This function finds out if two vaccines A and B are
-        related to each other through a common vaccine C
-        using the Breadth-first traversal technique.
+        related to each other through a common vaccine C,
+        i.e. if their shortest chain
+            vaccine > strain > vaccine > ... > vaccine
+        goes through at least one other vaccine and is at
+        most max_hops edges long. The chain is found with a
+        bidirectional Breadth-first traversal.
+        :param vacA: Vaccine-A name
+        :param vacB: Vaccine-B name
+        :param max_hops: maximum length of the chain in edges,
+                         None for no limit.
+        :return: list of the names on the chain, empty if the
+                 vaccines are not related.
+        """
+        output, chain = self._find_vaccine_connect(vacA, vacB, max_hops)
+        self._write(output)
+        return chain
+
+    def _find_vaccine_connect(self, vacA, vacB, max_hops=4, tree=None):
+        """
+        Output of findVaccineConnect.
         :param vacA: Vaccine-A name
         :param vacB: Vaccine-B name
+        :param max_hops: maximum length of the chain in edges.
+        :param tree: optional bfs_tree already grown from vacA,
+                     shared by the queries starting from vacA.
+        :return: (output, list of the names on the chain).
         """
+        probe = None
+        if self.stats is not None:
+            probe = self.stats.probe('findVaccineConnect', vacA, vacB)
+        key = ('findVaccineConnect', vacA, vacB, max_hops)
+        result = self._cache_get(key)
+        if result is not None:
+            output, chain = result
+            if probe is not None:
+                probe.cached = True
+                probe.done()
+            return output, list(chain)
         output_intro = f"""\n--------Function findVaccineConnect --------
 Vaccine A: {vacA}
 Vaccine B: {vacB}
 Related: """
         output_string = f"***'{vacA}' and '{vacB}' are not related " + \
                         f"to each other through a common vaccine.***"
-        start = Vertex(vacA, 'vaccine')
-        end = Vertex(vacB, 'vaccine')
+        start = self._node(vacA, 'vaccine')
+        end = self._node(vacB, 'vaccine')
+        chain = []
 
-        if not self.has_vertex(start):
+        if start is None:
             output_string = f"***Information about '{vacA}' " + \
                             f"is not available.***"
-        elif not self.has_vertex(end):
+        elif end is None:
             output_string = f"***Information about '{vacB}' " + \
                             f"is not available.***"
+        elif start == end:
+            output_string = f"Inputs '{vacA}' and '{vacB}' " + \
+                            "refer to the same vaccine."
+        elif self._component_index().connected(start, end):
+            if tree is None:
+                path = self._shortest_chain(start, end, max_hops, probe)
+            else:
+                path = tree_path(tree, end)
+            # a 2 hop chain is a common strain, not a common vaccine
+            if path is not None and len(path) > 3:
+                chain = [self._name(x) for x in path]
+                output_string = "Yes, " + " > ".join(chain)
+
+        self._cache_put(key, (output_intro + output_string, tuple(chain)))
+        if probe is not None:
+            probe.done()
+        return output_intro + output_string, chain
+
+    def _shortest_chain(self, start, end, max_hops=None, probe=None):
+        """
+        Shortest chain between two vertices.
+        :param start: handle of the first vertex.
+        :param end: handle of the second vertex.
+        :param max_hops: maximum length of the chain in edges,
+                         None for no limit.
+        :param probe: optional Probe counting the work done.
+        :return: list of handles from start to end, None if
+                 they are not connected within max_hops.
+        """
+        if self.projection is not None:
+            return self.projection.shortest_chain(start, end, max_hops)
+        return bidirectional_bfs(start, end, self._neighbours, max_hops,
+                                 probe)
+
+    def answer(self, function, args, max_hops=4):
+        """
+        Answer one parsed prompt without writing its output.
+        :param function: function name, see PROMPTS.
+        :param args: list of its arguments.
+        :param max_hops: max_hops of findVaccineConnect.
+        :return: (output, result) where result is the list of
+                 the names found (strains, vaccines, common
+                 strains or chain), None for an unknown strain
+                 or vaccine of displayVaccine / displayStrains.
+        """
+        if function == 'displayStrains':
+            output = self._display_strains(*args)
+            node = self._node(args[0], 'vaccine')
+        elif function == 'displayVaccine':
+            output = self._display_vaccine(*args)
+            node = self._node(args[0], 'strain')
+        elif function == 'commonStrain':
+            return self._common_strain(*args)
+        elif function == 'findVaccineConnect':
+            return self._find_vaccine_connect(*args, max_hops=max_hops)
+        else:
+            raise ValueError("Unknown function " + function + ".")
+        if node is None:
+            return output, None
+        return output, [self._name(x) for x in self._neighbours(node)]
+
+    def _write(self, output):
+        """
+        Send the output of a function to the sink.
+        :param output: text to write.
+        """
+        self.sink.write(output)
+
+    def run_prompts(self, prompts_file, max_hops=4, workers=1):
+        """
+        Run all the prompts of a promptsPS16.txt-like file as
+        one batch. The prompts are parsed up front and grouped
+        by function, identical prompts are answered once, and
+        the findVaccineConnect prompts of a Vaccine-A asked
+        against many vaccines share a single Breadth-first
+        traversal. All the outputs are written at once, in the
+        prompts order.
+        With workers > 1 the prompts are spread over a pool of
+        forked processes which all read the very graph of this
+        process (copy-on-write), the graph is never pickled.
+        Their queries are not measured into stats.
+        :param prompts_file: path of the prompts file.
+        :param max_hops: max_hops of findVaccineConnect.
+        :param workers: number of processes answering prompts.
+        :return: number of prompts run.
+        """
+        prompts = [(function, tuple(args)) for function, args
+                   in read_prompts(prompts_file)]
+        queries = list(dict.fromkeys(prompts))
+        if workers > 1 and 'fork' in mp.get_all_start_methods():
+            outputs = self._answer_parallel(queries, max_hops, workers)
         else:
-            visited = []
-            to_visit = [[start]]
-            if start == end:
-                output_string = f"Inputs '{vacA}' and '{vacB}' " + \
-                                "refer to the same vaccine."
-                with open("outputPS16.txt", "a") as fout:
-                    fout.write(output_intro + output_string)
-                    fout.close()
-                return
-            while to_visit:
-                path = to_visit.pop(0)
-                node = path[-1]
-                if node not in visited:
-                    neighbours = self.list_connections(node)
-                    for neighbour in neighbours:
-                        new_path = list(path)
-                        new_path.append(neighbour)
-                        to_visit.append(new_path)
-                        if neighbour == end:
-                            if len(new_path) == 5:
-                                visited_name = [x.name for x in new_path]
-                                output_string = "Yes, " + " > " \
-                                    .join(visited_name) + ""
-                                with open("outputPS16.txt", "a") as fout:
-                                    fout.write(output_intro + output_string)
-                                    fout.close()
-                                    return
-                            else:
-                                with open("outputPS16.txt", "a") as fout:
-                                    fout.write(output_intro + output_string)
-                                    fout.close()
-                                    return
-                    visited.append(node)
-        with open("outputPS16.txt", "a") as fout:
-            fout.write(output_intro + output_string)
-            fout.close()
-        return
+            outputs = self._answer(queries, max_hops)
+
+        self.sink.writelines(outputs[prompt] for prompt in prompts)
+        return len(prompts)
+
+    def _answer(self, queries, max_hops=4):
+        """
+        Answer distinct prompts, grouped by function.
+        :param queries: list of (function name, arguments tuple).
+        :param max_hops: max_hops of findVaccineConnect.
+        :return: dict (function name, arguments) -> output.
+        """
+        outputs = dict()
+        by_source = defaultdict(list)
+        for function, args in queries:
+            if function == 'findVaccineConnect':
+                by_source[args[0]].append(args)
+            elif function == 'displayStrains':
+                outputs[function, args] = self._display_strains(*args)
+            elif function == 'displayVaccine':
+                outputs[function, args] = self._display_vaccine(*args)
+            elif function == 'commonStrain':
+                outputs[function, args] = self._common_strain(*args)[0]
+
+        for vacA, pairs in by_source.items():
+            tree = None
+            start = self._node(vacA, 'vaccine')
+            if len(pairs) >= SHARED_BFS_MIN_TARGETS and \
+                    start is not None and self.projection is None:
+                targets = [self._node(vacB, 'vaccine')
+                           for _, vacB in pairs]
+                connected = self._component_index().connected
+                probe = None
+                if self.stats is not None:
+                    probe = self.stats.probe('bfs_tree', vacA)
+                tree = bfs_tree(start, self._neighbours, max_hops,
+                                [x for x in targets if x is not None and
+                                 connected(start, x)], probe)
+                if probe is not None:
+                    probe.done()
+            for args in pairs:
+                outputs['findVaccineConnect', args] = \
+                    self._find_vaccine_connect(
+                        *args, max_hops=max_hops, tree=tree)[0]
+        return outputs
+
+    def _answer_parallel(self, queries, max_hops, workers):
+        """
+        Answer distinct prompts over a pool of forked processes.
+        The findVaccineConnect prompts of the same Vaccine-A stay
+        in the same task so they can still share a traversal.
+        :param queries: list of (function name, arguments tuple).
+        :param max_hops: max_hops of findVaccineConnect.
+        :param workers: number of processes.
+        :return: dict (function name, arguments) -> output.
+        """
+        units = defaultdict(list)
+        for i, (function, args) in enumerate(queries):
+            if function == 'findVaccineConnect':
+                units['source', args[0]].append((function, args))
+            else:
+                units['chunk', i // PARALLEL_CHUNK_SIZE].append(
+                    (function, args))
+        tasks = []
+        task = []
+        for unit in units.values():
+            task.extend(unit)
+            if len(task) >= PARALLEL_CHUNK_SIZE:
+                tasks.append(task)
+                task = []
+        if task:
+            tasks.append(task)
+
+        # the workers must not inherit pending output
+        self.sink.flush()
+        global _worker_graph
+        _worker_graph = self
+        try:
+            with mp.get_context('fork').Pool(workers) as pool:
+                outputs = dict()
+                for answered in pool.imap_unordered(
+                        _answer_in_worker,
+                        [(task, max_hops) for task in tasks]):
+                    outputs.update(answered)
+        finally:
+            _worker_graph = None
+        return outputs
+
+
+# graph read by the forked workers of Immunization.run_prompts
+_worker_graph = None
+
+
+def _answer_in_worker(task):
+    """
+    Answer a task of prompts in a worker process.
+    :param task: (list of queries, max_hops).
+    """
+    queries, max_hops = task
+    return _worker_graph._answer(queries, max_hops)
+
+
+# prompt name -> (Immunization function, number of arguments)
+PROMPTS = {
+    "displayStrains": ("displayStrains", 1),
+    "listVaccine": ("displayVaccine", 1),
+    "commonStrain": ("commonStrain", 2),
+    "findVaccineConnect": ("findVaccineConnect", 2),
+}
+
+
+def split_prompt(line):
+    """
+    Split one prompt line, e.g. 'commonStrain: A : B'.
+    :param line: prompt line.
+    :return: (function name, list of arguments), None if the
+             prompt is blank.
+    :raise ValueError: if the prompt cannot be run.
+    """
+    l_arr = line.split(":")
+    prompt = l_arr[0].strip()
+    if not prompt:
+        return None
+    if prompt not in PROMPTS:
+        raise ValueError("***Prompt : " + prompt + " - Not implemented!")
+    function, n_args = PROMPTS[prompt]
+    args = [x.strip() for x in l_arr[1:]]
+    if len(args) != n_args:
+        raise ValueError("***Prompt : " + line.strip() +
+                         " - Expected " + str(n_args) + " argument(s)!")
+    return function, args
+
+
+def parse_prompt(line):
+    """
+    Parse one prompt line, e.g. 'commonStrain: A : B'.
+    :param line: prompt line.
+    :return: (function name, list of arguments), None if the
+             prompt is blank or cannot be run.
+    """
+    try:
+        return split_prompt(line)
+    except ValueError as error:
+        print(error)
+        return None
+
+
+def read_delta(delta_file):
+    """
+    Read the records of a delta file, see apply_delta.
+    :param delta_file: path of the delta file.
+    :return: generator of (op, strain name, vaccine name).
+    """
+    with open(delta_file) as fi:
+        for line in fi:
+            line = line.strip()
+            op = '+'
+            if line[:1] in ('+', '-'):
+                op, line = line[0], line[1:]
+            names = [name.strip() for name in line.split('/')]
+            if not names[0]:
+                continue
+            for vaccine in names[1:]:
+                if vaccine:
+                    yield op, names[0], vaccine
+
+
+def read_prompts(prompts_file):
+    """
+    Lazily parse a promptsPS16.txt-like file.
+    :param prompts_file: path of the prompts file.
+    :return: generator of (function name, list of arguments).
+    """
+    with open(prompts_file, 'r') as f:
+        for line in f:
+            prompt = parse_prompt(line)
+            if prompt is not None:
+                yield prompt
 
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description="Run the prompts of promptsPS16.txt against "
+                    "the graph of inputPS16.txt.")
+    arg_parser.add_argument('--frozen', action='store_true',
+                            help="load the graph in its compact "
+                                 "read-only form")
+    arg_parser.add_argument('--snapshot',
+                            help="binary snapshot of the graph, "
+                                 "loaded instead of the input file "
+                                 "while it is current")
+    arg_parser.add_argument('--no-verify-hash', action='store_true',
+                            help="trust the mtime and size of the "
+                                 "input file to check the snapshot, "
+                                 "without hashing it")
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help="number of processes answering "
+                                 "the prompts")
+    arg_parser.add_argument('--serve', metavar='ADDRESS',
+                            help="instead of running the prompts file, "
+                                 "serve prompts on a Unix socket path "
+                                 "or a host:port TCP address")
+    arg_parser.add_argument('--stats', action='store_true',
+                            help="measure the queries and print a "
+                                 "summary table at the end")
+    arg_parser.add_argument('--trace',
+                            help="JSON lines file receiving the "
+                                 "measures of every query "
+                                 "(implies --stats)")
+    args = arg_parser.parse_args()
+    stats = None
+    if args.stats or args.trace:
+        stats = Instrumentation(args.trace)
+
     # initialise paths
     file_path = 'inputPS16.txt'
     prompts_path = 'promptsPS16.txt'
 
     # read input path
-    a = Immunization().readInputfile(file_path)
-    a.displayAll()
-
-    # prompt path
-    with open(prompts_path, 'r') as f:
-        file_read = f.read()
-    input_spl = file_read.split("\n")
-
-    # run prompts
-    for line in input_spl:
-        l_arr = line.split(":")
-        if l_arr[0] == "displayStrains":
-            a.displayStrains(l_arr[1].strip())
-        elif l_arr[0] == "listVaccine":
-            a.displayVaccine(l_arr[1].strip())
-        elif l_arr[0] == "commonStrain":
-            a.commonStrain(l_arr[1].strip(),
-                           l_arr[2].strip())
-        elif l_arr[0] == "findVaccineConnect":
-            a.findVaccineConnect(l_arr[1].strip(),
-                                 l_arr[2].strip())
-        else:
-            print("***Prompt : " + l_arr[0] +
-                  " - Not implemented!")
+    a = Immunization(stats=stats).readInputfile(
+        file_path, frozen=args.frozen, snapshot=args.snapshot,
+        verify_hash=not args.no_verify_hash)
+    if a.parse_stats is not None:
+        print(a.parse_stats)
+    if args.serve:
+        from immunization_server import serve
+        serve(a, args.serve, workers=args.workers)
+    else:
+        a.displayAll()
+
+        # run prompts
+        a.run_prompts(prompts_path, workers=args.workers)
+    a.sink.close()
+    if stats is not None:
+        stats.close()
+        print(stats.summary())
@@ -0,0 +1,160 @@
+import itertools
+import os
+import random
+
+import pytest
+
+import main
+import immunization_snapshot
+from immunization_bench import generate_graph
+from immunization_components import ComponentIndex
+from immunization_cover import exact_cover, greedy_cover
+from immunization_sink import NullSink
+from immunization_snapshot import SnapshotError
+
+# lines of the Fano plane: 7 strains, 7 vaccines of 3 strains,
+# covered by no fewer than 3 of them
+FANO = [(0, 1, 2), (0, 3, 4), (0, 5, 6), (1, 3, 5), (1, 4, 6), (2, 3, 6),
+        (2, 4, 5)]
+
+
+def _graph():
+    return main.Immunization(sink=NullSink(), cache_size=0)
+
+
+def _write_fano(path, copies):
+    """Input file of disjoint copies of the Fano plane."""
+    with open(path, 'w') as fo:
+        for c in range(copies):
+            for strain in range(7):
+                vaccines = ['V%d_%d' % (c, i) for i, line in enumerate(FANO)
+                            if strain in line]
+                fo.write('S%d_%d / ' % (c, strain) + ' / '.join(vaccines) +
+                         '\n')
+
+
+def _assert_components(graph):
+    """Compare the component index to one built from scratch."""
+    expected = ComponentIndex.from_graph(graph.vertices.values(),
+                                         graph._neighbours)
+    index = graph._component_index()
+    vertices = list(graph.vertices.values())
+    for a in vertices:
+        assert index.component_size(a) == expected.component_size(a)
+        for b in vertices[:10]:
+            assert index.connected(a, b) == expected.connected(a, b)
+
+
+@pytest.mark.parametrize('budget', [2, 16, None])
+def test_apply_delta_components(monkeypatch, budget):
+    monkeypatch.setattr(main, 'SPLIT_BUDGET', budget)
+    rnd = random.Random(budget)
+    graph = _graph()
+    edges = [('S%d' % rnd.randrange(30), 'V%d' % rnd.randrange(20))
+             for _ in range(60)]
+    graph.apply_delta([('+', s, v) for s, v in edges])
+    _assert_components(graph)
+    for _ in range(60):
+        batch = []
+        for _ in range(rnd.randint(1, 4)):
+            if rnd.random() < 0.6:
+                batch.append(('-',) + rnd.choice(edges))
+            else:
+                batch.append(('+', 'S%d' % rnd.randrange(30),
+                              'V%d' % rnd.randrange(20)))
+        graph.apply_delta(batch)
+        _assert_components(graph)
+
+
+def test_apply_delta_rejects_unknown_op():
+    graph = _graph()
+    with pytest.raises(ValueError):
+        graph.apply_delta([('+', 'S1', 'V1'), ('x', 'S2', 'V2')])
+    assert graph.is_empty()
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = str(tmp_path / 'input.txt')
+    snapshot = str(tmp_path / 'graph.snap')
+    _write_fano(source, 3)
+    graph = _graph().readInputfile(source)
+    graph.save_snapshot(snapshot)
+    loaded = main.Immunization.load_snapshot(snapshot, source,
+                                             sink=NullSink())
+    # a frozen graph lists the strains first
+    for vtx_type in ('strain', 'vaccine'):
+        assert [x.name for x in loaded if x.type == vtx_type] == \
+               [x.name for x in graph if x.type == vtx_type]
+    assert [(s.name, v.name) for s, v in loaded.edges] == \
+           [(s.name, v.name) for s, v in graph.edges]
+    assert loaded.component_sizes() == graph.component_sizes()
+
+
+def test_snapshot_stale_on_same_mtime_and_size(tmp_path):
+    source = str(tmp_path / 'input.txt')
+    snapshot = str(tmp_path / 'graph.snap')
+    with open(source, 'w') as fo:
+        fo.write('S1 / Va\nS2 / Vb\n')
+    _graph().readInputfile(source, snapshot=snapshot)
+    stat = os.stat(source)
+    with open(source, 'w') as fo:
+        fo.write('S1 / Vc\nS2 / Vb\n')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert immunization_snapshot.is_current(snapshot, source,
+                                            verify_hash=False)
+    assert not immunization_snapshot.is_current(snapshot, source)
+    with pytest.raises(SnapshotError):
+        main.Immunization.load_snapshot(snapshot, source, sink=NullSink())
+    graph = _graph().readInputfile(source, snapshot=snapshot)
+    assert graph._node('Vc', 'vaccine') is not None
+    assert graph._node('Va', 'vaccine') is None
+
+
+def test_exact_cover_small():
+    rnd = random.Random(3)
+    for _ in range(100):
+        n, m = rnd.randint(1, 10), rnd.randint(1, 8)
+        candidates = [(k, [x for x in range(n) if rnd.random() < 0.3])
+                      for k in range(m)]
+        universe = sorted({x for _, elements in candidates
+                           for x in elements})
+        cover, optimal = exact_cover(universe, candidates,
+                                     greedy_cover(universe, candidates))
+        assert optimal
+        best = min(len(keys) for size in range(m + 1)
+                   for keys in itertools.combinations(range(m), size)
+                   if set().union(*(candidates[k][1] for k in keys)) >=
+                   set(universe))
+        assert len(cover) == best
+
+
+def test_exact_cover_deep(tmp_path):
+    source = str(tmp_path / 'input.txt')
+    _write_fano(source, 1200)
+    graph = _graph().readInputfile(source)
+    cover = graph.minimal_vaccine_cover(exact=True, max_nodes=3000)
+    assert not cover.optimal
+    assert len(cover) == len(graph.minimal_vaccine_cover())
+    # small instances are still solved exactly
+    strains = ['S%d_%d' % (c, i) for c in range(3) for i in range(7)]
+    cover = graph.minimal_vaccine_cover(strains, exact=True)
+    assert cover.optimal and len(cover) == 9
+    # and so is a search deeper than the recursion limit
+    universe = list(range(5000))
+    candidates = [(x, [x]) for x in universe]
+    assert exact_cover(universe, candidates, max_elements=5000,
+                       max_size=5000, max_nodes=10000) == \
+        (universe, True)
+
+
+def test_similar_vaccines_finds_k():
+    graph = _graph().readInputfile(generate_graph(20000))
+    names = [x.name for x in graph if x.type == 'vaccine']
+    sample = random.Random(0).sample(names, 50)
+    assert all(len(graph.similar_vaccines(name, 5)) == 5 for name in sample)
+    index = graph.similarity
+    graph.enable_projection()
+    graph.freeze()
+    graph.similar_vaccines(sample[0], 5)
+    # only edge changes rebuild the index
+    assert graph.similarity is index